@@ -117,6 +117,7 @@ def add_test_data():
     with app.app_context():
         print("Adding ADHD-friendly test journal entries...")
         
+        saved_entries = []
         for entry_data in test_entries:
             try:
                 # Parse timestamp if provided, otherwise use date
@@ -138,19 +139,22 @@ def add_test_data():
                     saved_entry = journal_service.save_entry(text, timestamp=timestamp)
                     print(f"✓ Added entry for {date_str}")
                 
-                # Generate AI analysis for the entry
-                ai_response = ai_service.analyze_entry(text, mode='reflective')
-                
-                # Update the entry with AI response
-                update_data = {
-                    "ai_response": ai_response
-                }
-                journal_service.update_entry(saved_entry['id'], update_data)
-                print(f"✓ Added AI analysis")
+                saved_entries.append(saved_entry)
                 
             except Exception as e:
                 print(f"✗ Error adding entry: {str(e)}")
         
+        # Generate AI analysis for all entries concurrently
+        ai_service.wait_until_ready(timeout=30)
+        for entry_id, ai_response, error in ai_service.analyze_batch(saved_entries, mode='reflective'):
+            if error:
+                print(f"✗ Error analyzing entry {entry_id}: {error}")
+                continue
+            
+            # Update the entry with AI response
+            journal_service.update_entry(entry_id, {"ai_response": ai_response})
+            print(f"✓ Added AI analysis for entry {entry_id}")
+        
         print(f"\nTest data setup complete! You now have {len(test_entries)} sample journal entries.")
         print("The entries show multiple timestamped entries per day - perfect for ADHD journaling!")
         print("Visit http://localhost:5000 to see the new multi-entry interface.")
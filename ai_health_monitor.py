@@ -0,0 +1,104 @@
+"""
+Background health monitoring for local AI backends
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+class BackendHealthMonitor:
+    """Probe AI backends in parallel on a background thread and cache the results.
+
+    probes maps a backend name to a callable returning its model list, or None
+    when the backend is unavailable. Results older than ttl seconds are stale.
+    """
+
+    def __init__(self, probes, ttl=60, on_update=None):
+        self.probes = probes
+        self.ttl = ttl
+        self.on_update = on_update
+        self._results = {}
+        self._lock = threading.Lock()
+        self._refresh_requested = threading.Event()
+        self._stopping = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start probing in the background"""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='ai-health-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._refresh_requested.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def request_refresh(self):
+        """Ask the background thread to probe again now"""
+        self._refresh_requested.set()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until the first probe round has finished"""
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def is_fresh(self):
+        """Whether every backend has a result younger than the TTL"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        with self._lock:
+            return len(self._results) == len(self.probes) and all(
+                result['checked_at'] >= cutoff for result in self._results.values()
+            )
+
+    def snapshot(self):
+        """Get a copy of the cached results"""
+        with self._lock:
+            return {name: dict(result) for name, result in self._results.items()}
+
+    def check(self, name, *args):
+        """Probe one backend synchronously, cache and return its models (None if unavailable)"""
+        try:
+            models = self.probes[name](*args)
+            error = None
+        except Exception as e:
+            models = None
+            error = str(e)
+            logging.debug(f"{name} probe failed: {error}")
+
+        self._record(name, models, error)
+        return models
+
+    def probe_all(self):
+        """Probe every backend in parallel and notify on_update"""
+        with ThreadPoolExecutor(max_workers=len(self.probes)) as executor:
+            list(executor.map(self.check, self.probes))
+
+        self._ready.set()
+        if self.on_update:
+            try:
+                self.on_update(self.snapshot())
+            except Exception as e:
+                logging.error(f"Error applying AI health update: {str(e)}")
+
+    def _record(self, name, models, error=None):
+        with self._lock:
+            self._results[name] = {
+                'available': models is not None,
+                'models': models or [],
+                'error': error,
+                'checked_at': datetime.utcnow()
+            }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self.probe_all()
+            self._refresh_requested.wait(self.ttl)
+            self._refresh_requested.clear()
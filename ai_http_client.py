@@ -0,0 +1,79 @@
+"""
+Pooled HTTP client for local AI backends
+"""
+import logging
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: the backend is busy or restarting
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+class BackendClient:
+    """Keep-alive connection pool for one backend base URL, with bounded retries"""
+
+    def __init__(self, base_url, pool_size=10, connect_timeout=3, read_timeout=30, max_retries=2, backoff=0.5):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def request(self, method, path, read_timeout=None, retries=None, **kwargs):
+        """Send a request, retrying connection failures and busy responses with exponential backoff.
+
+        Read timeouts are not retried: a model that is slow to answer will not get faster.
+        """
+        url = f"{self.base_url}{path}"
+        timeout = (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+        retries = self.max_retries if retries is None else retries
+
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.ConnectionError as e:
+                if last_attempt:
+                    raise
+                logging.debug(f"{method} {url} failed ({str(e)}), retrying")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                logging.debug(f"{method} {url} returned {response.status_code}, retrying")
+                response.close()
+
+            time.sleep(self.backoff * (2 ** attempt))
+
+    def close(self):
+        self.session.close()
+
+class RateLimiter:
+    """Space calls at least 1/rate seconds apart across threads; a rate of 0 disables limiting"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until this caller's slot comes up"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
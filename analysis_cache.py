@@ -0,0 +1,135 @@
+"""
+Persistent, content-addressed cache of AI analysis results
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from models import db, AnalysisCacheEntry
+
+class AnalysisCache:
+    def __init__(self, max_entries=5000, max_age_days=90, evict_every=100):
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_eviction = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_text(text):
+        """Collapse whitespace so trivially reformatted entries share a key"""
+        return ' '.join(text.split())
+
+    def make_key(self, text, mode, backend, model, prompt_version):
+        """Hash every input that can change the analysis"""
+        material = json.dumps([self.normalize_text(text), mode, backend, model, prompt_version])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key):
+        """Get a cached response, or None on a miss"""
+        try:
+            entry = AnalysisCacheEntry.query.filter_by(cache_key=cache_key).first()
+            if entry and entry.created_at < datetime.utcnow() - timedelta(days=self.max_age_days):
+                db.session.delete(entry)
+                db.session.commit()
+                entry = None
+
+            if entry is None:
+                self._count(hit=False)
+                return None
+
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_used_at = datetime.utcnow()
+            db.session.commit()
+            self._count(hit=True)
+            return entry.response_dict
+
+        except Exception as e:
+            logging.error(f"Error reading analysis cache: {str(e)}")
+            db.session.rollback()
+            self._count(hit=False)
+            return None
+
+    def put(self, cache_key, response, mode=None, backend=None, model=None, prompt_version=None):
+        """Store a response, evicting old entries periodically"""
+        try:
+            entry = AnalysisCacheEntry.query.filter_by(cache_key=cache_key).first()
+            if entry is None:
+                entry = AnalysisCacheEntry(cache_key=cache_key)
+                db.session.add(entry)
+
+            entry.response = json.dumps(response)
+            entry.insight_mode = mode
+            entry.backend = backend
+            entry.model_name = model
+            entry.prompt_version = prompt_version
+            entry.created_at = datetime.utcnow()
+            entry.last_used_at = datetime.utcnow()
+            db.session.commit()
+
+            with self._lock:
+                self._puts_since_eviction += 1
+                due = self._puts_since_eviction >= self.evict_every
+                if due:
+                    self._puts_since_eviction = 0
+            if due:
+                self.evict()
+
+        except Exception as e:
+            logging.error(f"Error writing analysis cache: {str(e)}")
+            db.session.rollback()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=self.max_age_days)
+            expired = AnalysisCacheEntry.query.filter(
+                AnalysisCacheEntry.created_at < cutoff
+            ).delete(synchronize_session=False)
+
+            overflow = AnalysisCacheEntry.query.count() - self.max_entries
+            evicted = 0
+            if overflow > 0:
+                oldest = db.session.query(AnalysisCacheEntry.id).order_by(
+                    AnalysisCacheEntry.last_used_at.asc()
+                ).limit(overflow).subquery()
+                evicted = AnalysisCacheEntry.query.filter(
+                    AnalysisCacheEntry.id.in_(db.select(oldest.c.id))
+                ).delete(synchronize_session=False)
+
+            db.session.commit()
+            if expired or evicted:
+                logging.info(f"Evicted {expired} expired and {evicted} least-recently-used analysis cache entries")
+            return expired + evicted
+
+        except Exception as e:
+            logging.error(f"Error evicting analysis cache: {str(e)}")
+            db.session.rollback()
+            return 0
+
+    def clear(self):
+        """Remove every cached analysis"""
+        AnalysisCacheEntry.query.delete(synchronize_session=False)
+        db.session.commit()
+
+    def get_stats(self):
+        """Get hit/miss counters for this process and the stored entry count"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0,
+            'entries': AnalysisCacheEntry.query.count()
+        }
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
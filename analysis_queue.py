@@ -0,0 +1,168 @@
+"""
+Persistent background queue for AI analysis of journal entries
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from models import db, AnalysisJob, JournalEntry
+
+class AnalysisQueue:
+    def __init__(self, app, ai_service, journal_service):
+        self.app = app
+        self.ai_service = ai_service
+        self.journal_service = journal_service
+        self.num_workers = app.config.get('ANALYSIS_WORKERS', 2)
+        self.poll_interval = app.config.get('ANALYSIS_POLL_INTERVAL', 5)
+        self.max_attempts = app.config.get('ANALYSIS_MAX_ATTEMPTS', 3)
+        self.job_timeout = app.config.get('ANALYSIS_JOB_TIMEOUT', 300)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._workers = []
+
+    def start(self):
+        """Recover interrupted jobs and start the worker pool"""
+        if self._workers:
+            return
+
+        with self.app.app_context():
+            self.requeue_stale_jobs()
+
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"analysis-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        logging.info(f"Started {self.num_workers} analysis workers")
+
+    def stop(self, timeout=None):
+        """Signal workers to exit and wait for them"""
+        self._stopping.set()
+        self._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def enqueue(self, entry_id, mode='reflective'):
+        """Queue an entry for analysis and return the job data"""
+        try:
+            job = AnalysisJob(entry_id=entry_id, insight_mode=mode, status='pending')
+            db.session.add(job)
+            db.session.commit()
+            job_data = job.to_dict()
+
+            self._wakeup.set()
+            logging.info(f"Queued analysis job {job.id} for entry {entry_id}")
+            return job_data
+
+        except Exception as e:
+            logging.error(f"Error queueing analysis job: {str(e)}")
+            db.session.rollback()
+            raise
+
+    def get_job(self, job_id):
+        """Get a job by ID"""
+        job = AnalysisJob.query.get(job_id)
+        return job.to_dict() if job else None
+
+    def get_entry_status(self, entry_id):
+        """Get the most recent job for an entry"""
+        job = AnalysisJob.query.filter_by(entry_id=entry_id).order_by(AnalysisJob.id.desc()).first()
+        return job.to_dict() if job else None
+
+    def get_active_entry_ids(self, entry_ids=None):
+        """Get IDs of entries with a pending or running job"""
+        query = db.session.query(AnalysisJob.entry_id).filter(AnalysisJob.status.in_(['pending', 'running']))
+        if entry_ids is not None:
+            query = query.filter(AnalysisJob.entry_id.in_(entry_ids))
+        return {row.entry_id for row in query.distinct()}
+
+    def delete_entry_jobs(self, entry_id):
+        """Remove all jobs for an entry (caller commits)"""
+        AnalysisJob.query.filter_by(entry_id=entry_id).delete(synchronize_session=False)
+
+    def requeue_stale_jobs(self):
+        """Return jobs left running by a crashed or restarted worker to the queue"""
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.job_timeout)
+            count = AnalysisJob.query.filter(
+                AnalysisJob.status == 'running',
+                AnalysisJob.started_at < cutoff
+            ).update({AnalysisJob.status: 'pending'}, synchronize_session=False)
+            db.session.commit()
+
+            if count:
+                logging.info(f"Requeued {count} stale analysis jobs")
+            return count
+
+        except Exception as e:
+            logging.error(f"Error requeueing stale jobs: {str(e)}")
+            db.session.rollback()
+            return 0
+
+    def _worker_loop(self):
+        """Process jobs until stopped, sleeping when the queue is empty"""
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    processed = self._process_next_job()
+            except Exception as e:
+                logging.error(f"Analysis worker error: {str(e)}")
+                processed = False
+
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim_next_job(self):
+        """Atomically move the oldest pending job to running"""
+        candidates = AnalysisJob.query.filter_by(status='pending').order_by(AnalysisJob.id.asc()).limit(5).all()
+
+        for candidate in candidates:
+            # Conditional update so concurrent workers (or processes) never claim the same job
+            claimed = AnalysisJob.query.filter_by(id=candidate.id, status='pending').update({
+                AnalysisJob.status: 'running',
+                AnalysisJob.started_at: datetime.utcnow(),
+                AnalysisJob.attempts: AnalysisJob.attempts + 1
+            }, synchronize_session=False)
+            db.session.commit()
+
+            if claimed:
+                db.session.refresh(candidate)
+                return candidate
+
+        return None
+
+    def _process_next_job(self):
+        """Run one queued job. Returns False when the queue is empty."""
+        job = self._claim_next_job()
+        if job is None:
+            return False
+
+        try:
+            entry = JournalEntry.query.get(job.entry_id)
+            if entry is None:
+                self._finish_job(job, 'failed', "Entry no longer exists")
+                return True
+
+            ai_response = self.ai_service.analyze_entry(entry.text, job.insight_mode, tokens=entry.token_list)
+            self.journal_service.update_entry(entry.id, {
+                'ai_response': ai_response,
+                'insight_mode': job.insight_mode
+            })
+            self._finish_job(job, 'done')
+            logging.info(f"Completed analysis job {job.id} for entry {job.entry_id}")
+
+        except Exception as e:
+            logging.error(f"Analysis job {job.id} failed: {str(e)}")
+            db.session.rollback()
+            status = 'pending' if job.attempts < self.max_attempts else 'failed'
+            self._finish_job(job, status, str(e))
+
+        return True
+
+    def _finish_job(self, job, status, error=None):
+        """Record the outcome of a job"""
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow() if status in ('done', 'failed') else None
+        db.session.commit()
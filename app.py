@@ -1,10 +1,19 @@
 import os
+import json
+import hashlib
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, abort, Response, stream_with_context, session, g
 from datetime import datetime, timedelta
 from database_ai_service import DatabaseAIService
-from database_journal_service import DatabaseJournalService
-from pattern_analyzer import PatternAnalyzer
+from database_journal_service import DatabaseJournalService, FACETS
+from pattern_analyzer import PatternAnalyzer, ANALYTICS_BUCKETS
+from analysis_queue import AnalysisQueue
+from local_ai_service import PROMPT_VERSION
+from migrations import run_migrations
+from local_time import local_today
+from journal_exporter import EXPORT_FORMATS, export_chunks, export_filename
+from page_cache import PageCache
+from storage import database_uri, engine_options, configure_engine
 from config import Config
 
 # Configure logging
@@ -13,53 +22,124 @@ logging.basicConfig(level=logging.DEBUG)
 app = Flask(__name__)
 app.config.from_object(Config)
 app.secret_key = app.config['SECRET_KEY']
-app.config['SQLALCHEMY_DATABASE_URI'] = app.config['DATABASE_URL']
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(app.config['DATABASE_URL'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = app.config['SQLALCHEMY_TRACK_MODIFICATIONS']
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['DATABASE_URL'])
 
 # Initialize SQLAlchemy
 from models import db
 
 db.init_app(app)
 
+def current_ai_status():
+    """The AI status snapshot for this request; every template and ETag in a request sees the same one"""
+    if 'ai_status' not in g:
+        g.ai_status = ai_service.get_status() if ai_service else {'backend': 'Loading...', 'available': False}
+    return g.ai_status
+
 # Make datetime and AI status available in templates
 @app.context_processor
 def inject_context():
     return {
         'datetime': datetime,
-        'ai_status': ai_service.get_status() if 'ai_service' in globals() else {'backend': 'Loading...', 'available': False}
+        'ai_status': current_ai_status()
     }
 
 # Import models and create database tables
-from models import JournalEntry, AIConfiguration, AnalyticsData
+from models import JournalEntry, AIConfiguration, AnalyticsData, AnalysisJob
 
 # Initialize services
 ai_service = None
 journal_service = None
 pattern_analyzer = None
+analysis_queue = None
 
 with app.app_context():
+    configure_engine(db.engine)
     db.create_all()
+    run_migrations()
     # Initialize services within app context
     ai_service = DatabaseAIService()
-    journal_service = DatabaseJournalService()
     pattern_analyzer = PatternAnalyzer()
+    journal_service = DatabaseJournalService(pattern_analyzer)
+    journal_service.ensure_change_version()
+    journal_service.ensure_enrichment()
+    journal_service.backfill_insights()
+    journal_service.ensure_facets()
+    journal_service.ensure_analytics()
     logging.info("Using Database-backed AI service")
 
+# Background workers run AI analysis so submissions never wait on the model; main.py starts
+# them when serving, so scripts importing app never claim queued jobs
+analysis_queue = AnalysisQueue(app, ai_service, journal_service)
+
+# Rendered pages, keyed on the journal change version plus what else each page shows
+page_cache = PageCache(max_entries=Config.PAGE_CACHE_SIZE)
+
+def conditional_page(render, *key, mimetype='text/html'):
+    """Serve render() with an ETag derived from the journal change version.
+    
+    key lists whatever the page shows besides journal data. A request whose
+    If-None-Match matches gets a 304 without rendering, and unchanged pages
+    come from page_cache. Pages with pending flash messages are always
+    rendered fresh, since a flash is shown only once.
+    """
+    if '_flashes' in session:
+        return Response(render(), mimetype=mimetype)
+    
+    version, _ = journal_service.get_change_version()
+    ai_status = current_ai_status()
+    key = (request.full_path, version, ai_status['backend'], bool(ai_status.get('detecting'))) + key
+    etag = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(page_cache.get_or_render(key, render), mimetype=mimetype)
+    # No Last-Modified: the key also covers AI status and page inputs that have no timestamp,
+    # so If-Modified-Since could answer 304 for a page that did change
+    response.set_etag(etag)
+    # Browsers may keep the page but must revalidate it on every view
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
     """Main journaling interface"""
-    today = datetime.now().strftime('%Y-%m-%d')
+    today = local_today().strftime('%Y-%m-%d')
     
-    # Get today's entries if they exist
-    today_entries = journal_service.get_entries_by_date(today)
+    # Entries still waiting on background analysis; a failed job changes this without touching entries
+    active_analysis = analysis_queue.get_active_entry_ids()
     
-    # Get recent entries for sidebar
-    recent_entries = journal_service.get_recent_entries(10)
+    def render():
+        # Get today's entries if they exist
+        today_entries = journal_service.get_entries_by_date(today)
+        
+        # Get recent entries for sidebar (summary view; older pages load from /api/entries)
+        recent_page = journal_service.list_entries(limit=10)
+        recent_entries = recent_page['entries']
+        pending_analysis = active_analysis & {entry['id'] for entry in recent_entries}
+        
+        # Entry whose analysis the page should stream live (set by submit_entry)
+        stream_entry_id = request.args.get('stream_entry', type=int)
+        stream_mode = request.args.get('mode', 'reflective')
+        if stream_entry_id:
+            # Reloading after the stream finished shows the stored analysis instead of running it again
+            stream_entry = journal_service.get_entry(stream_entry_id)
+            if not stream_entry or (stream_entry['ai_response'] and (stream_entry['analysis_version'] or 0) >= PROMPT_VERSION):
+                stream_entry_id = None
+        
+        return render_template('index.html', 
+                             today=today,
+                             today_entries=today_entries,
+                             recent_entries=recent_entries,
+                             recent_next_cursor=recent_page['next_cursor'],
+                             pending_analysis=pending_analysis,
+                             stream_entry_id=stream_entry_id,
+                             stream_mode=stream_mode)
     
-    return render_template('index.html', 
-                         today=today,
-                         today_entries=today_entries,
-                         recent_entries=recent_entries)
+    # The header shows the current date and time to the minute
+    return conditional_page(render, datetime.now().strftime('%Y-%m-%d %H:%M'), tuple(sorted(active_analysis)))
 
 @app.route('/submit_entry', methods=['POST'])
 def submit_entry():
@@ -76,17 +156,15 @@ def submit_entry():
         entry_title = request.form.get('entry_title', '').strip()
         entry_data = journal_service.save_entry(entry_text, title=entry_title)
         
-        # Only get AI response if not in "none" mode
+        # Only run AI analysis if not in "none" mode
         if insight_mode != 'none':
-            ai_response = ai_service.analyze_entry(entry_text, insight_mode)
+            if request.form.get('stream') == '1':
+                # Browser will stream the analysis live from /analysis_stream
+                flash('Your journal entry has been saved!', 'success')
+                return redirect(url_for('index', stream_entry=entry_data['id'], mode=insight_mode))
             
-            # Update entry with AI response
-            update_data = {
-                'ai_response': ai_response,
-                'insight_mode': insight_mode
-            }
-            journal_service.update_entry(entry_data['id'], update_data)
-            flash('Your journal entry has been saved and analyzed!', 'success')
+            analysis_queue.enqueue(entry_data['id'], insight_mode)
+            flash('Your journal entry has been saved! AI insights will appear shortly.', 'success')
         else:
             flash('Your journal entry has been saved!', 'success')
         return redirect(url_for('index'))
@@ -100,15 +178,11 @@ def submit_entry():
 def delete_entry(entry_id):
     """Delete a journal entry"""
     try:
-        from models import JournalEntry
-        entry = JournalEntry.query.get_or_404(entry_id)
-        
-        # Store entry info for confirmation message
-        entry_time = entry.datetime_str
-        
-        # Delete the entry
-        db.session.delete(entry)
-        db.session.commit()
+        # Drop any queued analysis, then delete the entry (which refreshes its day's analytics)
+        analysis_queue.delete_entry_jobs(entry_id)
+        entry_time = journal_service.delete_entry(entry_id)
+        if entry_time is None:
+            abort(404)
         
         flash(f'Entry from {entry_time} has been deleted.', 'info')
         return redirect(url_for('index'))
@@ -118,27 +192,189 @@ def delete_entry(entry_id):
         flash('Error deleting entry. Please try again.', 'error')
         return redirect(url_for('index'))
 
+@app.route('/analysis_status/<int:entry_id>')
+def analysis_status(entry_id):
+    """Report background analysis status for an entry"""
+    try:
+        job = analysis_queue.get_entry_status(entry_id)
+        if not job:
+            return jsonify({'entry_id': entry_id, 'status': 'none'}), 404
+        
+        return jsonify(job)
+        
+    except Exception as e:
+        logging.error(f"Error getting analysis status for entry {entry_id}: {str(e)}")
+        return jsonify({'entry_id': entry_id, 'status': 'error', 'message': str(e)}), 500
+
+@app.route('/analysis_stream/<int:entry_id>')
+def analysis_stream(entry_id):
+    """Stream AI analysis of an entry to the browser as server-sent events"""
+    entry = journal_service.get_entry(entry_id)
+    if not entry:
+        abort(404)
+    
+    mode = request.args.get('mode', 'reflective')
+    
+    def generate():
+        completed = False
+        try:
+            for event in ai_service.stream_analysis(entry['text'], mode, tokens=entry['tokens']):
+                if event['type'] == 'result':
+                    journal_service.update_entry(entry_id, {
+                        'ai_response': event['analysis'],
+                        'insight_mode': mode
+                    })
+                    completed = True
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            logging.error(f"Error streaming analysis for entry {entry_id}: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+        finally:
+            # Client went away or the stream failed: finish the analysis in the background
+            if not completed:
+                analysis_queue.enqueue(entry_id, mode)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/search')
+def search():
+    """Full-text search across journal entries"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = 20
+    
+    results = journal_service.search(query, limit=per_page, offset=(page - 1) * per_page) if query else {'results': [], 'has_more': False}
+    
+    return render_template('search.html',
+                         query=query,
+                         page=page,
+                         results=results['results'],
+                         has_more=results['has_more'])
+
+@app.route('/api/entries')
+def api_entries():
+    """Paginated entry listing; pass next_cursor back as ?cursor= for the next page.
+    
+    ?emotion=&theme=&archetype= (each repeatable; entries must carry every
+    value) and ?from=&to= (YYYY-MM-DD, inclusive) filter the listing and add
+    'total' and per-value 'facets' counts for the matching entries, as does
+    ?facets=1 on its own.
+    """
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    try:
+        facets = {facet: request.args.getlist(facet) for facet in FACETS if request.args.getlist(facet)}
+        start, end = date_arg('from'), date_arg('to')
+        page = journal_service.list_entries(limit=limit,
+                                            cursor=request.args.get('cursor'),
+                                            view=request.args.get('view', 'summary'),
+                                            facets=facets, start_date=start, end_date=end)
+        if facets or start or end or request.args.get('facets') == '1':
+            page.update(journal_service.get_facet_counts(facets, start, end))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(page)
+
+def date_arg(name):
+    """Parse an optional YYYY-MM-DD query parameter"""
+    value = request.args.get(name)
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError as e:
+        raise ValueError(f"Invalid {name} date '{value}'; use YYYY-MM-DD") from e
+
+def analytics_range():
+    """Parse the start, end (YYYY-MM-DD, inclusive) and bucket query parameters of the analytics API"""
+    bucket = request.args.get('bucket', 'auto')
+    if bucket != 'auto' and bucket not in ANALYTICS_BUCKETS:
+        raise ValueError(f"Unknown bucket '{bucket}'; use auto or one of {', '.join(ANALYTICS_BUCKETS)}")
+    return date_arg('start'), date_arg('end'), bucket
+
+def analytics_response(series):
+    """JSON for one analytics series over the requested range, revalidated through the change version"""
+    try:
+        start, end, bucket = analytics_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    max_points = min(max(request.args.get('points', Config.ANALYTICS_MAX_POINTS, type=int), 10), 5000)
+    
+    def render():
+        daily = journal_service.get_daily_analytics(start_date=start, end_date=end)
+        chosen = bucket
+        if chosen == 'auto':
+            # Span the requested range, or the days that have entries when it is open-ended
+            first = start or (datetime.strptime(daily[0]['date'], '%Y-%m-%d').date() if daily else None)
+            last = end or (datetime.strptime(daily[-1]['date'], '%Y-%m-%d').date() if daily else None)
+            chosen = pattern_analyzer.choose_bucket(first, last, max_points) if first and last else 'day'
+        return json.dumps({'bucket': chosen, **series(daily, chosen)})
+    
+    return conditional_page(render, mimetype='application/json')
+
+@app.route('/api/analytics/sentiment')
+def api_analytics_sentiment():
+    """Sentiment per day, week or month: ?start=&end=&bucket=&points="""
+    return analytics_response(lambda daily, bucket: {
+        'points': pattern_analyzer.get_sentiment_series(daily, bucket)
+    })
+
+@app.route('/api/analytics/themes')
+def api_analytics_themes():
+    """Theme totals and per-bucket theme counts: ?start=&end=&bucket=&points="""
+    return analytics_response(pattern_analyzer.get_theme_series)
+
+@app.route('/api/analytics/frequency')
+def api_analytics_frequency():
+    """Weekday histogram, streaks and entries per bucket: ?start=&end=&bucket=&points="""
+    return analytics_response(pattern_analyzer.get_frequency_series)
+
+@app.route('/api/analytics/insights')
+def api_analytics_insights():
+    """Entry counts per emotion, theme, archetype and insight mode, with mean sentiment: ?start=&end="""
+    try:
+        start, end, _ = analytics_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return conditional_page(lambda: json.dumps(journal_service.get_insight_summary(start, end)),
+                            mimetype='application/json')
+
+@app.route('/export')
+def export():
+    """Download the whole journal, streamed so memory use stays flat"""
+    fmt = request.args.get('format', 'jsonl')
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    compress = request.args.get('gzip') == '1'
+    
+    chunks = export_chunks(journal_service.iter_entries(), fmt, compress)
+    return Response(stream_with_context(chunks),
+                    mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt][0],
+                    headers={'Content-Disposition': f'attachment; filename="{export_filename(fmt, local_today(), compress)}"'})
+
 @app.route('/dashboard')
 def dashboard():
     """Pattern analysis dashboard"""
     try:
-        # Get entries for analysis
-        entries = journal_service.get_all_entries()
-        
-        # Analyze patterns
-        patterns = pattern_analyzer.analyze_patterns(entries)
+        # Served from per-day rollups maintained on write, so cost grows with days shown
+        days = request.args.get('days', type=int)
+        today = local_today()
         
-        # Get sentiment trends
-        sentiment_trends = pattern_analyzer.get_sentiment_trends(entries)
-        
-        # Get theme analysis
-        theme_analysis = pattern_analyzer.get_theme_analysis(entries)
+        def render():
+            start_date = today - timedelta(days=days - 1) if days else None
+            daily = journal_service.get_daily_analytics(start_date=start_date)
+            
+            # Only the summary is rendered; charts load their series from /api/analytics after first paint
+            patterns = pattern_analyzer.analyze_daily_patterns(daily)
+            
+            return render_template('dashboard.html',
+                                 patterns=patterns,
+                                 start_date=start_date.strftime('%Y-%m-%d') if start_date else '',
+                                 buckets=ANALYTICS_BUCKETS,
+                                 total_entries=patterns.get('total_entries', 0))
         
-        return render_template('dashboard.html',
-                             patterns=patterns,
-                             sentiment_trends=sentiment_trends,
-                             theme_analysis=theme_analysis,
-                             total_entries=len(entries))
+        return conditional_page(render, today)
         
     except Exception as e:
         logging.error(f"Error loading dashboard: {str(e)}")
@@ -165,14 +401,16 @@ def view_entry(date):
 def ai_settings():
     """AI configuration settings page"""
     try:
-        ai_status = ai_service.get_status()
+        ai_status = current_ai_status()
         available_endpoints = ai_service.get_available_endpoints()
         current_config = ai_service.get_configuration()
+        cache_stats = ai_service.get_cache_stats()
         
         return render_template('ai_settings.html',
                              ai_status=ai_status,
                              available_endpoints=available_endpoints,
-                             current_config=current_config)
+                             current_config=current_config,
+                             cache_stats=cache_stats)
         
     except Exception as e:
         logging.error(f"Error loading AI settings: {str(e)}")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Analyze journal entries that have no AI response, or whose response came from an
+older prompt version, using the configured AI backend
+
+Each result is saved as soon as it finishes, so an interrupted run simply resumes
+with the entries still outstanding when started again.
+
+Usage: python backfill_analysis.py [--mode MODE] [--outdated-only] [--limit N]
+                                   [--concurrency N] [--rate PER_SECOND] [--dry-run]
+"""
+import argparse
+import sys
+import time
+from app import app, ai_service, journal_service
+from local_ai_service import PROMPT_VERSION
+
+def pending_entries(limit=None, outdated_only=False, page_size=100):
+    """Yield entries needing analysis, paging forward by id"""
+    after_id = 0
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = journal_service.get_entries_needing_analysis(after_id=after_id, limit=size, outdated_only=outdated_only)
+        if not page:
+            return
+        for entry in page:
+            yield entry
+        after_id = page[-1]['id']
+        if remaining is not None:
+            remaining -= len(page)
+
+def backfill(mode=None, outdated_only=False, limit=None, concurrency=None, rate=None, dry_run=False):
+    with app.app_context():
+        print("Waiting for AI backend discovery...")
+        ai_service.wait_until_ready(timeout=30)
+        backend, model = ai_service.local_ai.get_active_model()
+        print(f"Analyzing with {backend}{f' ({model})' if model else ''}, prompt version {PROMPT_VERSION}")
+
+        entries = pending_entries(limit, outdated_only)
+        if mode:
+            entries = ({**entry, 'insight_mode': mode} for entry in entries)
+
+        if dry_run:
+            count = sum(1 for _ in entries)
+            print(f"{count} entries need analysis")
+            return 0
+
+        analyzed = failed = 0
+        started = time.perf_counter()
+        try:
+            for entry_id, result, error in ai_service.analyze_batch(entries, concurrency=concurrency, rate_limit=rate):
+                if error:
+                    failed += 1
+                    print(f"✗ Entry {entry_id}: {error}")
+                    continue
+
+                # Saving each result is the checkpoint: saved entries drop out of the next run
+                journal_service.update_entry(entry_id, {
+                    'ai_response': result,
+                    'insight_mode': result.get('mode'),
+                    'analysis_version': PROMPT_VERSION
+                })
+                analyzed += 1
+                if analyzed % 10 == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"✓ {analyzed} analyzed ({analyzed / elapsed:.2f} entries/s)")
+        except KeyboardInterrupt:
+            print("\nInterrupted - run again to continue with the remaining entries")
+
+        elapsed = time.perf_counter() - started
+        rate_per_second = analyzed / elapsed if elapsed else 0
+        print(f"\nDone: {analyzed} analyzed, {failed} failed in {elapsed:.1f}s ({rate_per_second:.2f} entries/s)")
+        return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mode', help='insight mode to use instead of each entry\'s own')
+    parser.add_argument('--outdated-only', action='store_true', help='only re-analyze entries from older prompt versions')
+    parser.add_argument('--limit', type=int, help='analyze at most this many entries')
+    parser.add_argument('--concurrency', type=int, help='analyses in flight (default AI_BATCH_CONCURRENCY)')
+    parser.add_argument('--rate', type=float, help='analyses started per second (default AI_BATCH_RATE_LIMIT)')
+    parser.add_argument('--dry-run', action='store_true', help='only count the entries that need analysis')
+    args = parser.parse_args()
+
+    return backfill(mode=args.mode, outdated_only=args.outdated_only, limit=args.limit,
+                    concurrency=args.concurrency, rate=args.rate, dry_run=args.dry_run)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark journal date queries against a synthetic database
+
+Compares the old function-wrapped date filter with the indexed entry_date
+column and prints SQLite's query plan for each, so a full table scan shows
+up as 'SCAN' instead of 'SEARCH ... USING INDEX'.
+
+Usage: python benchmark_queries.py [entry_count]
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from models import db, JournalEntry
+from migrations import run_migrations
+from local_time import local_date
+from database_journal_service import DatabaseJournalService
+from benchmark_support import build_app, populate, temporary_database
+
+def time_query(label, run, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = run()
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    print(f"{label:<40} {elapsed:8.2f} ms  ({len(result)} rows)")
+
+def query_plan(query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return ' | '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+
+def main():
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with temporary_database() as path:
+        app = build_app(path)
+        with app.app_context():
+            db.create_all()
+            run_migrations()
+            populate(entry_count)
+            db.session.execute(text('ANALYZE'))
+
+            service = DatabaseJournalService()
+            target = local_date(datetime.utcnow() - timedelta(days=entry_count // 8))
+            target_str = target.strftime('%Y-%m-%d')
+            range_start = (target - timedelta(days=30)).strftime('%Y-%m-%d')
+
+            wrapped = JournalEntry.query.filter(db.func.date(JournalEntry.timestamp) == target_str)
+            indexed = JournalEntry.query.filter(JournalEntry.entry_date == target)
+
+            print(f"{entry_count} entries, looking up {target_str}\n")
+            time_query('date(timestamp) = day (old)', wrapped.all)
+            time_query('entry_date = day', indexed.all)
+            time_query('get_entries_by_date', lambda: service.get_entries_by_date(target_str))
+            time_query('get_entries_in_range (31 days)', lambda: service.get_entries_in_range(range_start, target_str))
+            time_query('get_entry_stats', lambda: [service.get_entry_stats()])
+
+            print(f"\nold plan: {query_plan(wrapped)}")
+            print(f"new plan: {query_plan(indexed)}")
+
+            if 'USING INDEX' not in query_plan(indexed):
+                print("\nentry_date index is NOT used")
+                return 1
+            return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent reads and writes under each SQLite storage profile
+
+Writer processes save entries through DatabaseJournalService (each save
+also refreshes that day's analytics) while reader processes run the sidebar
+listing and dashboard rollup queries, like gunicorn workers sharing one
+database file. With the stock rollback journal readers wait out every
+commit; under WAL they should not, and no operation should fail.
+
+Usage: python benchmark_storage.py [--seconds N] [--writers N] [--readers N] [--entries N]
+"""
+import argparse
+import logging
+import multiprocessing
+import sys
+import time
+from sqlalchemy import text
+from models import db, JournalEntry, AnalyticsData
+from migrations import run_migrations
+from database_journal_service import DatabaseJournalService
+from storage import STORAGE_PROFILES, configure_engine
+from benchmark_support import build_app, populate, temporary_database
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def run_worker(kind, number, path, profile, seconds, results):
+    """One worker process (like a gunicorn worker) writing or reading until the time is up"""
+    app = build_app(path, profile)
+    times = []
+    errors = 0
+    with app.app_context():
+        configure_engine(db.engine, profile)
+        service = DatabaseJournalService()
+        deadline = time.monotonic() + seconds
+        i = 0
+        while time.monotonic() < deadline:
+            i += 1
+            started = time.perf_counter()
+            try:
+                if kind == 'write':
+                    service.save_entry(f'Worker {number} entry {i}: a good day at work with family.')
+                else:
+                    # The sidebar listing and the dashboard rollup totals
+                    db.session.query(JournalEntry.id, JournalEntry.title).order_by(
+                        JournalEntry.timestamp.desc()).limit(20).all()
+                    db.session.query(db.func.sum(AnalyticsData.entry_count)).scalar()
+                    db.session.commit()  # end the read transaction like a request teardown would
+                times.append(time.perf_counter() - started)
+            except Exception:
+                db.session.rollback()
+                errors += 1
+    results.put((kind, times, errors))
+
+def run_profile(profile, args):
+    with temporary_database() as path:
+        app = build_app(path, profile)
+        with app.app_context():
+            configure_engine(db.engine, profile)
+            db.create_all()
+            run_migrations()
+            populate(args.entries)
+            DatabaseJournalService().rebuild_analytics()
+            journal_mode = db.session.execute(text('PRAGMA journal_mode')).scalar()
+            db.engine.dispose()
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=run_worker, args=('write', n, path, profile, args.seconds, results))
+                   for n in range(args.writers)]
+        workers += [multiprocessing.Process(target=run_worker, args=('read', n, path, profile, args.seconds, results))
+                    for n in range(args.readers)]
+        for worker in workers:
+            worker.start()
+
+        times = {'read': [], 'write': []}
+        errors = {'read': 0, 'write': 0}
+        for _ in workers:
+            kind, worker_times, worker_errors = results.get()
+            times[kind].extend(worker_times)
+            errors[kind] += worker_errors
+        for worker in workers:
+            worker.join()
+
+        ms = lambda seconds: seconds * 1000
+        reads, writes = times['read'], times['write']
+        print(f"{profile:<8} {journal_mode:<7} {len(reads) / args.seconds:>8.0f} {ms(percentile(reads, 0.5)):>8.2f} "
+              f"{ms(percentile(reads, 0.95)):>8.2f} {ms(max(reads, default=0)):>8.1f} "
+              f"{len(writes) / args.seconds:>8.0f} {ms(percentile(writes, 0.95)):>8.1f} "
+              f"{errors['read']:>7} {errors['write']:>7}")
+        return errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--entries', type=int, default=20000)
+    args = parser.parse_args()
+
+    # Lock errors are counted below; logging each one would drown the table
+    logging.disable(logging.ERROR)
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s per profile, {args.entries} entries\n")
+    print(f"{'profile':<8} {'journal':<7} {'reads/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'writes/s':>8} {'w p95':>8} {'r errs':>7} {'w errs':>7}")
+    results = {profile: run_profile(profile, args) for profile in reversed(STORAGE_PROFILES)}
+    return 0 if not any(results['wal'].values()) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Shared setup for the benchmark scripts
+
+Builds a bare Flask app over a throwaway SQLite file and fills it with
+synthetic entries, without the services and background work app.py starts.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, JournalEntry
+from local_time import local_date
+from storage import engine_options
+
+def build_app(path, profile=None):
+    """A Flask app bound to the SQLite file at path, with the storage profile's engine options"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], profile)
+    db.init_app(app)
+    return app
+
+@contextmanager
+def temporary_database():
+    """Path of an empty SQLite file, removed along with its journal files afterwards"""
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    try:
+        yield path
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+def populate(entry_count, batch_size=5000):
+    """Insert entry_count entries spread a few per day back from today"""
+    start = datetime.utcnow() - timedelta(hours=6 * entry_count)
+    batch = []
+    for i in range(entry_count):
+        timestamp = start + timedelta(hours=6 * i)
+        batch.append({
+            'timestamp': timestamp,
+            'entry_date': local_date(timestamp),
+            'text': f'Benchmark entry {i} about work, sleep and family.',
+            'word_count': 8,
+            'created_at': timestamp,
+            'updated_at': timestamp
+        })
+        if len(batch) == batch_size:
+            db.session.execute(JournalEntry.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(JournalEntry.__table__.insert(), batch)
+    db.session.commit()
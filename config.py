@@ -11,6 +11,13 @@ class Config:
     # Database settings
     DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///selfscope.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    STORAGE_PROFILE = os.environ.get('STORAGE_PROFILE', 'wal')  # 'wal' tunes SQLite for concurrent workers; 'default' leaves it stock
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'))  # ms a writer waits for the write lock
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '65536'))  # page cache per connection
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))  # bytes of the file read through mmap
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))  # server databases only
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '1800'))  # seconds before a pooled connection is replaced
     
     # Local AI settings
     OLLAMA_URL = os.environ.get('OLLAMA_URL', 'http://localhost:11434')
@@ -18,6 +25,23 @@ class Config:
     LM_STUDIO_URL = os.environ.get('LM_STUDIO_URL', 'http://localhost:1234/v1')
     LM_STUDIO_MODEL = os.environ.get('LM_STUDIO_MODEL', 'Hermes-3-Llama-3.2-3B')  # Your Hermes model
     
+    # HTTP client settings for local AI backends
+    AI_HTTP_POOL_SIZE = int(os.environ.get('AI_HTTP_POOL_SIZE', '10'))  # keep-alive connections per backend
+    AI_CONNECT_TIMEOUT = float(os.environ.get('AI_CONNECT_TIMEOUT', '3'))
+    AI_READ_TIMEOUT = float(os.environ.get('AI_READ_TIMEOUT', '30'))
+    AI_PROBE_TIMEOUT = float(os.environ.get('AI_PROBE_TIMEOUT', '5'))
+    AI_MAX_RETRIES = int(os.environ.get('AI_MAX_RETRIES', '2'))
+    AI_PROBE_RETRIES = int(os.environ.get('AI_PROBE_RETRIES', '0'))
+    AI_RETRY_BACKOFF = float(os.environ.get('AI_RETRY_BACKOFF', '0.5'))  # seconds, doubled per retry
+    AI_HEALTH_TTL = int(os.environ.get('AI_HEALTH_TTL', '60'))  # seconds between background backend probes
+    AI_BATCH_CONCURRENCY = int(os.environ.get('AI_BATCH_CONCURRENCY', '2'))  # analyses in flight during batch runs
+    AI_BATCH_RATE_LIMIT = float(os.environ.get('AI_BATCH_RATE_LIMIT', '0'))  # analyses started per second; 0 is unlimited
+    
+    # AI analysis cache
+    ANALYSIS_CACHE_ENABLED = os.environ.get('ANALYSIS_CACHE_ENABLED', 'True').lower() == 'true'
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYSIS_CACHE_MAX_ENTRIES', '5000'))
+    ANALYSIS_CACHE_MAX_AGE_DAYS = int(os.environ.get('ANALYSIS_CACHE_MAX_AGE_DAYS', '90'))
+    
     # Alternative local AI endpoints
     LOCAL_AI_ENDPOINTS = [
         {'name': 'Ollama', 'url': OLLAMA_URL, 'enabled': True},
@@ -26,14 +50,23 @@ class Config:
         # {'name': 'Text-generation-webui', 'url': 'http://localhost:5000', 'enabled': False},
     ]
     
+    # Background analysis queue
+    ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', '2'))
+    ANALYSIS_POLL_INTERVAL = float(os.environ.get('ANALYSIS_POLL_INTERVAL', '5'))
+    ANALYSIS_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_MAX_ATTEMPTS', '3'))
+    ANALYSIS_JOB_TIMEOUT = int(os.environ.get('ANALYSIS_JOB_TIMEOUT', '300'))  # seconds before a running job is considered stale
+    
     # Journaling settings
     JOURNAL_DATA_DIR = os.environ.get('JOURNAL_DATA_DIR', 'journal_entries')
     MAX_ENTRY_LENGTH = int(os.environ.get('MAX_ENTRY_LENGTH', '5000'))
+    JOURNAL_TIMEZONE = os.environ.get('JOURNAL_TIMEZONE', '')  # IANA name, e.g. 'Europe/Berlin'; empty uses the server's local time
     
     # Analysis settings
     ENABLE_SENTIMENT_ANALYSIS = os.environ.get('ENABLE_SENTIMENT_ANALYSIS', 'True').lower() == 'true'
     ENABLE_THEME_DETECTION = os.environ.get('ENABLE_THEME_DETECTION', 'True').lower() == 'true'
+    ANALYTICS_MAX_POINTS = int(os.environ.get('ANALYTICS_MAX_POINTS', '366'))  # chart points before bucket=auto moves to weeks, then months
     
     # UI settings
     DEFAULT_INSIGHT_MODE = os.environ.get('DEFAULT_INSIGHT_MODE', 'reflective')
-    WORDS_PER_MINUTE_READING = int(os.environ.get('WORDS_PER_MINUTE_READING', '200'))
\ No newline at end of file
+    WORDS_PER_MINUTE_READING = int(os.environ.get('WORDS_PER_MINUTE_READING', '200'))
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', '64'))  # rendered pages kept per process; 0 disables
\ No newline at end of file
@@ -2,13 +2,24 @@
 Database-backed AI configuration service
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from flask import current_app
 from models import db, AIConfiguration
-from local_ai_service import LocalAIService
+from local_ai_service import LocalAIService, PROMPT_VERSION
+from analysis_cache import AnalysisCache
+from ai_http_client import RateLimiter
+from config import Config
 
 class DatabaseAIService:
     def __init__(self):
-        self.local_ai = LocalAIService()
+        # Discovery starts after the stored configuration is applied so it probes the right URLs
+        self.local_ai = LocalAIService(start_monitor=False)
+        self.cache = AnalysisCache(
+            max_entries=Config.ANALYSIS_CACHE_MAX_ENTRIES,
+            max_age_days=Config.ANALYSIS_CACHE_MAX_AGE_DAYS
+        ) if Config.ANALYSIS_CACHE_ENABLED else None
         self.load_configuration()
+        self.local_ai.start_health_monitor()
     
     def load_configuration(self):
         """Load AI configuration from database"""
@@ -16,7 +27,7 @@ class DatabaseAIService:
             config = AIConfiguration.query.filter_by(is_active=True).first()
             if config:
                 # Apply database configuration to local AI service
-                self.local_ai.config.update(config.to_dict())
+                self.local_ai.apply_configuration(config.to_dict())
                 self.local_ai.check_available_services()
                 logging.info(f"Loaded AI configuration: {config.endpoint_type}")
             else:
@@ -62,9 +73,7 @@ class DatabaseAIService:
             db.session.add(new_config)
             db.session.commit()
             
-            # Apply new configuration
-            self.local_ai.config.update(config_data)
-            self.local_ai.check_available_services()
+            # update_configuration has already applied and verified the chosen backend
             
             logging.info(f"Saved AI configuration: {config_data.get('endpoint_type')}")
             return True
@@ -97,9 +106,108 @@ class DatabaseAIService:
         """Test current AI connection"""
         return self.local_ai.test_connection()
     
-    def analyze_entry(self, entry_text, mode='reflective'):
-        """Analyze journal entry using configured AI service"""
-        return self.local_ai.analyze_entry(entry_text, mode)
+    def analyze_entry(self, entry_text, mode='reflective', backend=None, tokens=None):
+        """Analyze journal entry using configured AI service, reusing cached results.
+        
+        tokens are the entry's stored distinct words, which rule-based analysis reads instead of the text.
+        """
+        # One backend snapshot serves the cache key and the analysis, so a reconfiguration cannot split them
+        backend = backend or self.local_ai.active_backend()
+        cache_key = self._cache_lookup_key(entry_text, mode, backend)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        result = self.local_ai.analyze_entry(entry_text, mode, backend, tokens)
+        if cache_key:
+            self._cache_result(cache_key, result, mode, backend)
+        return result
+    
+    def analyze_batch(self, entries, mode='reflective', concurrency=None, rate_limit=None):
+        """Analyze many entries with bounded concurrency, yielding results as they finish.
+        
+        entries is an iterable of dicts with 'id', 'text' and optionally
+        'insight_mode'; it is consumed lazily, so a generator over a large
+        table is fine. Yields (entry_id, result, error) in completion order,
+        with at most `concurrency` analyses in flight and new ones started no
+        faster than rate_limit per second. Callers checkpoint by saving each
+        result as it is yielded.
+        
+        A rule-based fallback while a model backend is configured counts as an
+        error, so the entry can be retried once the backend is back.
+        """
+        concurrency = max(concurrency or Config.AI_BATCH_CONCURRENCY, 1)
+        limiter = RateLimiter(Config.AI_BATCH_RATE_LIMIT if rate_limit is None else rate_limit)
+        app = current_app._get_current_object()
+        
+        def run(entry):
+            limiter.wait()
+            # Each worker thread gets its own app context and database session for the cache
+            with app.app_context():
+                backend = self.local_ai.active_backend()
+                result = self.analyze_entry(entry['text'], entry.get('insight_mode') or mode, backend,
+                                            entry.get('tokens'))
+            if result.get('local_analysis') and backend['endpoint_type'] != 'rule_based':
+                raise RuntimeError(f"{backend['endpoint_type']} analysis failed; rule-based fallback not kept")
+            return result
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-batch') as executor:
+            pending = {}
+            for entry in entries:
+                pending[executor.submit(run, entry)] = entry['id']
+                if len(pending) >= concurrency:
+                    yield from self._collect_finished(pending)
+            while pending:
+                yield from self._collect_finished(pending)
+    
+    @staticmethod
+    def _collect_finished(pending):
+        """Wait for at least one future and yield (entry_id, result, error) for each finished one"""
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            entry_id = pending.pop(future)
+            try:
+                yield entry_id, future.result(), None
+            except Exception as e:
+                yield entry_id, None, str(e)
+    
+    def wait_until_ready(self, timeout=None):
+        """Block until backend discovery has finished its first round"""
+        return self.local_ai.health_monitor.wait_until_ready(timeout)
+    
+    def stream_analysis(self, entry_text, mode='reflective', tokens=None):
+        """Analyze journal entry, yielding streaming progress events"""
+        backend = self.local_ai.active_backend()
+        cache_key = self._cache_lookup_key(entry_text, mode, backend)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield {'type': 'result', 'analysis': cached}
+                return
+        
+        for event in self.local_ai.stream_analysis(entry_text, mode, backend, tokens):
+            if event['type'] == 'result' and cache_key:
+                self._cache_result(cache_key, event['analysis'], mode, backend)
+            yield event
+    
+    def get_cache_stats(self):
+        """Get analysis cache counters"""
+        return self.cache.get_stats() if self.cache else None
+    
+    def _cache_lookup_key(self, entry_text, mode, backend):
+        """Cache key for an analysis on an active_backend() snapshot, or None when caching does not apply"""
+        # Rule-based analysis is instant, so it is never cached
+        if not self.cache or backend['endpoint_type'] == 'rule_based':
+            return None
+        return self.cache.make_key(entry_text, mode, backend['endpoint_type'], backend['model'], PROMPT_VERSION)
+    
+    def _cache_result(self, cache_key, result, mode, backend):
+        # A rule-based fallback after a backend error must not be cached under the model's key
+        if result.get('local_analysis'):
+            return
+        self.cache.put(cache_key, result, mode=mode, backend=backend['endpoint_type'], model=backend['model'],
+                       prompt_version=PROMPT_VERSION)
     
     def analyze_sentiment(self, text):
         """Analyze sentiment of text"""
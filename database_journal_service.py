@@ -1,14 +1,92 @@
 """
-Database-backed journal service using SQLite
+Database-backed journal service for SQLite and Postgres
 """
+import base64
+import json
 import logging
+import re
+from collections import defaultdict
+from collections.abc import Mapping
 from datetime import datetime, timedelta, date
-from models import db, JournalEntry, AnalyticsData
-from sqlalchemy.exc import IntegrityError
+from markupsafe import Markup, escape
+from itertools import groupby
+from sqlalchemy import text, insert, update, delete, select, intersect
+from models import db, JournalEntry, AnalyticsData, JournalState, EntryInsight, EntryFacet
+from local_time import local_date, to_local
+from local_ai_service import PROMPT_VERSION
+from pattern_analyzer import PatternAnalyzer
+from entry_enricher import EntryEnricher, ENRICHMENT_VERSION
+from migrations import POSTGRES_SEARCH_DOCUMENT
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+# Private-use characters wrap search hits so snippets can be HTML-escaped before highlighting
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+
+# Listing views: 'summary' for sidebars and history, 'full' when the body and AI response are shown
+ENTRY_VIEWS = ('summary', 'full')
+PREVIEW_LENGTH = 120
+
+# Facets entries are tagged with in entry_facets: every matched emotion and theme, and the AI archetype
+FACETS = ('emotion', 'theme', 'archetype')
+# Bump when the facet rows change so ensure_facets rebuilds them once on the next start
+FACETS_VERSION = 1
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+# Fields iter_entries can yield: name -> (columns fetched, conversion from the row)
+ENTRY_FIELDS = {
+    'id': ((JournalEntry.id,), lambda row: row.id),
+    'timestamp': ((JournalEntry.timestamp,), lambda row: row.timestamp.isoformat()),
+    'date': ((JournalEntry.timestamp,), lambda row: to_local(row.timestamp).strftime('%Y-%m-%d')),
+    'time': ((JournalEntry.timestamp,), lambda row: to_local(row.timestamp).strftime('%H:%M')),
+    'title': ((JournalEntry.title,), lambda row: row.title),
+    'text': ((JournalEntry.text,), lambda row: row.text),
+    'word_count': ((JournalEntry.word_count,), lambda row: row.word_count),
+    'reading_seconds': ((JournalEntry.reading_seconds,), lambda row: row.reading_seconds),
+    'keyword_counts': ((JournalEntry.keyword_counts,), lambda row: json.loads(row.keyword_counts) if row.keyword_counts else None),
+    'sentiment_score': ((JournalEntry.sentiment_score,), lambda row: row.sentiment_score),
+    'text_profile': ((JournalEntry.text_profile,), lambda row: json.loads(row.text_profile) if row.text_profile else {}),
+    'insight_mode': ((JournalEntry.insight_mode,), lambda row: row.insight_mode),
+    'ai_response': ((JournalEntry.ai_response,), lambda row: JournalEntry.parse_ai_response(row.ai_response)),
+    'analysis_version': ((JournalEntry.analysis_version,), lambda row: row.analysis_version),
+    'created_at': ((JournalEntry.created_at,), lambda row: _isoformat(row.created_at)),
+    'updated_at': ((JournalEntry.updated_at,), lambda row: _isoformat(row.updated_at))
+}
+
+class EntryRecord(Mapping):
+    """Read-only entry dict over a projected row; each field is converted on first access"""
+    __slots__ = ('_row', '_fields', '_values')
+    
+    def __init__(self, row, fields):
+        self._row = row
+        self._fields = fields
+        self._values = {}
+    
+    def __getitem__(self, field):
+        if field not in self._values:
+            if field not in self._fields:
+                raise KeyError(field)
+            self._values[field] = ENTRY_FIELDS[field][1](self._row)
+        return self._values[field]
+    
+    def __contains__(self, field):
+        return field in self._fields
+    
+    def __iter__(self):
+        return iter(self._fields)
+    
+    def __len__(self):
+        return len(self._fields)
+    
+    def __repr__(self):
+        return f'<EntryRecord {dict(self)}>'
 
 class DatabaseJournalService:
-    def __init__(self):
-        pass
+    def __init__(self, pattern_analyzer=None):
+        self.pattern_analyzer = pattern_analyzer or PatternAnalyzer()
+        self.enricher = EntryEnricher(self.pattern_analyzer)
     
     def save_entry(self, entry_text, title=None, timestamp=None):
         """Save a new journal entry with timestamp"""
@@ -18,16 +96,21 @@ class DatabaseJournalService:
             elif isinstance(timestamp, str):
                 timestamp = datetime.fromisoformat(timestamp)
                 
-            word_count = len(entry_text.split())
+            derived = self.enricher.enrich(entry_text)
             
             # Create new entry (always create new, never update)
             new_entry = JournalEntry(
                 timestamp=timestamp,
+                entry_date=local_date(timestamp),
                 text=entry_text,
-                word_count=word_count,
-                title=title
+                title=title,
+                **derived
             )
             db.session.add(new_entry)
+            db.session.flush()
+            self._write_insights([new_entry])
+            self._refresh_rollups([new_entry.entry_date])
+            self._bump_change_version()
             db.session.commit()
             
             entry_data = {
@@ -36,7 +119,8 @@ class DatabaseJournalService:
                 'date': new_entry.date_str,
                 'time': new_entry.time_str,
                 'text': entry_text,
-                'word_count': word_count,
+                'word_count': derived['word_count'],
+                'reading_seconds': derived['reading_seconds'],
                 'title': title,
                 'created_at': new_entry.created_at.isoformat(),
                 'updated_at': new_entry.updated_at.isoformat()
@@ -50,19 +134,76 @@ class DatabaseJournalService:
             db.session.rollback()
             raise
     
+    def save_entries(self, entries, skip_duplicates=True):
+        """Insert many entries in one transaction and refresh analytics once for the affected days.
+        
+        Each entry is a dict with 'text' and 'timestamp' (naive UTC datetime), and
+        optionally 'title', 'ai_response' (dict), 'insight_mode' and
+        'analysis_version'. With skip_duplicates, entries whose timestamp and text
+        already exist are left out, so re-running an import is harmless.
+        Returns (inserted_count, skipped_count).
+        """
+        try:
+            if skip_duplicates and entries:
+                existing = set(db.session.query(JournalEntry.timestamp, JournalEntry.text).filter(
+                    JournalEntry.timestamp.in_({entry['timestamp'] for entry in entries})
+                ).all())
+                fresh, seen = [], set()
+                for entry in entries:
+                    key = (entry['timestamp'], entry['text'])
+                    if key not in existing and key not in seen:
+                        seen.add(key)
+                        fresh.append(entry)
+            else:
+                fresh = list(entries)
+            
+            now = datetime.utcnow()
+            rows = [{
+                'timestamp': entry['timestamp'],
+                'entry_date': local_date(entry['timestamp']),
+                'text': entry['text'],
+                'title': entry.get('title') or None,
+                'ai_response': json.dumps(entry['ai_response']) if entry.get('ai_response') else None,
+                'analysis_version': entry.get('analysis_version') if entry.get('ai_response') else None,
+                'insight_mode': entry.get('insight_mode') or 'reflective',
+                'created_at': entry.get('created_at') or now,
+                'updated_at': now,
+                **self.enricher.enrich(entry['text'])
+            } for entry in fresh]
+            
+            if rows:
+                # Executemany: one statement, one transaction for the whole chunk
+                db.session.execute(insert(JournalEntry), rows)
+                days = {row['entry_date'] for row in rows}
+                self._write_insights(self._entries_missing_insights().filter(JournalEntry.entry_date.in_(days)).all())
+                self._refresh_rollups(days)
+                self._bump_change_version()
+                db.session.commit()
+            
+            return len(rows), len(entries) - len(rows)
+            
+        except Exception as e:
+            logging.error(f"Error saving {len(entries)} entries: {str(e)}")
+            db.session.rollback()
+            raise
+    
     def update_entry(self, entry_id, entry_data):
         """Update an existing journal entry by ID"""
         try:
             entry = JournalEntry.query.get(entry_id)
             
             if entry:
-                # Update fields from entry_data
-                if 'text' in entry_data:
+                text_changed = 'text' in entry_data and entry_data['text'] != entry.text
+                
+                # Update fields from entry_data; derived fields are only recomputed for new text
+                if text_changed:
                     entry.text = entry_data['text']
-                    entry.word_count = len(entry_data['text'].split())
+                    for column, value in self.enricher.enrich(entry.text).items():
+                        setattr(entry, column, value)
                 
                 if 'ai_response' in entry_data:
                     entry.ai_response_dict = entry_data['ai_response']
+                    entry.analysis_version = entry_data.get('analysis_version', PROMPT_VERSION)
                 
                 if 'insight_mode' in entry_data:
                     entry.insight_mode = entry_data['insight_mode']
@@ -70,7 +211,13 @@ class DatabaseJournalService:
                 if 'title' in entry_data:
                     entry.title = entry_data['title']
                 
+                if text_changed or 'ai_response' in entry_data or 'insight_mode' in entry_data:
+                    self._write_insights([entry])
+                
                 entry.updated_at = datetime.utcnow()
+                if text_changed:
+                    self._refresh_rollups([entry.entry_date])
+                self._bump_change_version()
                 db.session.commit()
                 
                 logging.info(f"Updated journal entry {entry_id}")
@@ -82,129 +229,629 @@ class DatabaseJournalService:
             db.session.rollback()
             raise
     
+    def delete_entry(self, entry_id):
+        """Delete a journal entry by ID. Returns the deleted entry's datetime string, or None."""
+        try:
+            entry = JournalEntry.query.get(entry_id)
+            if not entry:
+                logging.warning(f"No entry found with ID {entry_id} to delete")
+                return None
+            
+            entry_time = entry.datetime_str
+            entry_day = entry.entry_date
+            
+            EntryInsight.query.filter_by(entry_id=entry_id).delete(synchronize_session=False)
+            EntryFacet.query.filter_by(entry_id=entry_id).delete(synchronize_session=False)
+            db.session.delete(entry)
+            self._refresh_rollups([entry_day])
+            self._bump_change_version()
+            db.session.commit()
+            
+            logging.info(f"Deleted journal entry {entry_id}")
+            return entry_time
+            
+        except Exception as e:
+            logging.error(f"Error deleting entry: {str(e)}")
+            db.session.rollback()
+            raise
+    
+    def ensure_enrichment(self, batch_size=500):
+        """Derive the stored text fields of entries written before them or under an older ENRICHMENT_VERSION.
+        
+        Insights and rollups are rebuilt afterwards when existing values
+        changed; first-time enrichment matches what they were built from.
+        """
+        total = 0
+        restated = 0
+        try:
+            while True:
+                rows = db.session.query(
+                    JournalEntry.id, JournalEntry.text, JournalEntry.enrichment_version, JournalEntry.updated_at
+                ).filter(db.or_(
+                    JournalEntry.enrichment_version.is_(None),
+                    JournalEntry.enrichment_version != ENRICHMENT_VERSION
+                )).order_by(JournalEntry.id.asc()).limit(batch_size).all()
+                if not rows:
+                    break
+                
+                db.session.execute(update(JournalEntry), [
+                    # updated_at is passed through so the column's onupdate does not touch it
+                    {'id': row.id, 'updated_at': row.updated_at, **self.enricher.enrich(row.text)} for row in rows
+                ])
+                db.session.commit()
+                total += len(rows)
+                restated += sum(1 for row in rows if row.enrichment_version is not None)
+            
+        except Exception as e:
+            logging.error(f"Error enriching entries: {str(e)}")
+            db.session.rollback()
+            return total
+        
+        if total:
+            logging.info(f"Enriched {total} entries")
+        if restated:
+            self.rebuild_insights()
+            self.rebuild_analytics()
+        return total
+    
+    def backfill_insights(self, batch_size=500):
+        """Derive insight rows for entries that have none, such as those written before entry_insights existed"""
+        total = 0
+        try:
+            while True:
+                entries = self._entries_missing_insights().limit(batch_size).all()
+                if not entries:
+                    break
+                self._write_insights(entries)
+                db.session.commit()
+                total += len(entries)
+            
+        except Exception as e:
+            logging.error(f"Error backfilling entry insights: {str(e)}")
+            db.session.rollback()
+        
+        if total:
+            logging.info(f"Backfilled insights for {total} entries")
+        return total
+    
+    def ensure_facets(self):
+        """Build the facet index once for journals whose insights predate it or an older FACETS_VERSION"""
+        state = db.session.get(JournalState, 1)
+        if state is None or state.facets_version == FACETS_VERSION:
+            return
+        
+        if EntryInsight.query.first() is not None and self.rebuild_insights() is None:
+            return  # left unrecorded so the next start retries
+        state.facets_version = FACETS_VERSION
+        db.session.commit()
+    
+    def rebuild_insights(self, batch_size=500):
+        """Rewrite the insight and facet rows of every entry; returns the count, or None if it failed"""
+        total = 0
+        last_id = 0
+        try:
+            while True:
+                entries = self._insight_inputs().filter(JournalEntry.id > last_id).limit(batch_size).all()
+                if not entries:
+                    break
+                self._write_insights(entries)
+                db.session.commit()
+                total += len(entries)
+                last_id = entries[-1].id
+            
+        except Exception as e:
+            logging.error(f"Error rebuilding entry insights: {str(e)}")
+            db.session.rollback()
+            return None
+        
+        logging.info(f"Rebuilt insights for {total} entries")
+        return total
+    
+    def get_insight_summary(self, start_date=None, end_date=None):
+        """Entry counts per dominant emotion, theme, archetype and insight mode, plus mean sentiment"""
+        def in_range(query):
+            if start_date:
+                query = query.filter(EntryInsight.entry_date >= start_date)
+            if end_date:
+                query = query.filter(EntryInsight.entry_date <= end_date)
+            return query
+        
+        def counts(column):
+            entries = db.func.count(EntryInsight.entry_id)
+            rows = in_range(db.session.query(column, entries).filter(column.isnot(None))).group_by(column).order_by(
+                entries.desc(), column.asc()
+            )
+            return [[value, count] for value, count in rows]
+        
+        try:
+            total, sentiment = in_range(db.session.query(
+                db.func.count(EntryInsight.entry_id),
+                db.func.avg(EntryInsight.sentiment_score)
+            )).one()
+            
+            return {
+                'entries': total,
+                'avg_sentiment': round(sentiment or 0, 3),
+                'emotions': counts(EntryInsight.emotion),
+                'themes': counts(EntryInsight.theme),
+                'archetypes': counts(EntryInsight.archetype),
+                'insight_modes': counts(EntryInsight.insight_mode)
+            }
+            
+        except Exception as e:
+            logging.error(f"Error summarizing entry insights: {str(e)}")
+            return {'entries': 0, 'avg_sentiment': 0, 'emotions': [], 'themes': [], 'archetypes': [], 'insight_modes': []}
+    
+    @staticmethod
+    def _insight_inputs():
+        """Query for the columns insights are derived from, in id order"""
+        return db.session.query(
+            JournalEntry.id, JournalEntry.entry_date, JournalEntry.keyword_counts, JournalEntry.sentiment_score,
+            JournalEntry.ai_response, JournalEntry.insight_mode, JournalEntry.analysis_version
+        ).order_by(JournalEntry.id.asc())
+    
+    def _entries_missing_insights(self):
+        """Query for the insight inputs of entries without an insight row"""
+        return self._insight_inputs().outerjoin(EntryInsight, EntryInsight.entry_id == JournalEntry.id).filter(
+            EntryInsight.entry_id.is_(None)
+        )
+    
+    def _write_insights(self, entries):
+        """Replace the insight and facet rows of entries (models or rows carrying the insight inputs); caller commits"""
+        rows = []
+        facet_rows = []
+        for entry in entries:
+            counts = json.loads(entry.keyword_counts) if entry.keyword_counts else {}
+            ai_response = JournalEntry.parse_ai_response(entry.ai_response)
+            # Keep the archetype's name, e.g. "The Lover archetype" from "The Lover archetype - exploring ..."
+            archetype = re.split(r'\s+[-–—]\s+', str(ai_response.get('archetype') or '').strip(), maxsplit=1)[0][:200] or None
+            rows.append({
+                'entry_id': entry.id,
+                'entry_date': entry.entry_date,
+                'emotion': self.pattern_analyzer.dominant(counts, 'emotion'),
+                'theme': self.pattern_analyzer.dominant(counts, 'theme'),
+                'sentiment_score': entry.sentiment_score,
+                'archetype': archetype,
+                'insight_mode': ai_response.get('mode') or entry.insight_mode,
+                'analysis_version': entry.analysis_version
+            })
+            
+            tags = [('emotion', emotion) for emotion in counts.get('emotion', {})]
+            tags += [('theme', theme) for theme in counts.get('theme', {})]
+            if archetype:
+                tags.append(('archetype', archetype))
+            facet_rows += [{'entry_id': entry.id, 'facet': facet, 'value': value, 'entry_date': entry.entry_date}
+                           for facet, value in tags]
+        
+        if rows:
+            entry_ids = [row['entry_id'] for row in rows]
+            db.session.execute(delete(EntryInsight).where(EntryInsight.entry_id.in_(entry_ids)))
+            db.session.execute(delete(EntryFacet).where(EntryFacet.entry_id.in_(entry_ids)))
+            db.session.execute(insert(EntryInsight), rows)
+            if facet_rows:
+                db.session.execute(insert(EntryFacet), facet_rows)
+        return len(rows)
+    
+    def get_facet_counts(self, facets=None, start_date=None, end_date=None):
+        """Entries matching the facet and date filters, and how many of them carry each facet value.
+        
+        facets maps a facet name to the values an entry must all carry, e.g.
+        {'emotion': ['stress'], 'theme': ['work']}. Returns {'total': int,
+        'facets': {facet: [[value, count], ...]}}, most common values first.
+        Raises ValueError for an unknown facet.
+        """
+        matching = self._facet_filter(facets, start_date, end_date)
+        
+        try:
+            count = db.func.count(EntryFacet.entry_id)
+            query = db.session.query(EntryFacet.facet, EntryFacet.value, count)
+            if matching is not None:
+                query = query.filter(EntryFacet.entry_id.in_(matching))
+            if start_date:
+                query = query.filter(EntryFacet.entry_date >= start_date)
+            if end_date:
+                query = query.filter(EntryFacet.entry_date <= end_date)
+            
+            counts = {facet: [] for facet in FACETS}
+            for facet, value, entries in query.group_by(EntryFacet.facet, EntryFacet.value).order_by(
+                    count.desc(), EntryFacet.value.asc()):
+                counts[facet].append([value, entries])
+            
+            if matching is not None:
+                total = db.session.execute(select(db.func.count()).select_from(matching.subquery())).scalar()
+            else:
+                total = self._in_date_range(db.session.query(db.func.count(JournalEntry.id)), start_date, end_date).scalar()
+            
+            return {'total': total, 'facets': counts}
+            
+        except Exception as e:
+            logging.error(f"Error counting facets: {str(e)}")
+            return {'total': 0, 'facets': {facet: [] for facet in FACETS}}
+    
+    @staticmethod
+    def _facet_filter(facets, start_date=None, end_date=None):
+        """Select of the ids of entries carrying every requested facet value in the date range, or None without facets"""
+        selects = []
+        for facet, values in (facets or {}).items():
+            if facet not in FACETS:
+                raise ValueError(f"Unknown facet '{facet}'")
+            for value in values:
+                # Each value is one range of the lookup index; intersecting them keeps entries tagged with all
+                tagged = select(EntryFacet.entry_id).where(EntryFacet.facet == facet, EntryFacet.value == value)
+                if start_date:
+                    tagged = tagged.where(EntryFacet.entry_date >= start_date)
+                if end_date:
+                    tagged = tagged.where(EntryFacet.entry_date <= end_date)
+                selects.append(tagged)
+        
+        if not selects:
+            return None
+        return selects[0] if len(selects) == 1 else intersect(*selects)
+    
+    @staticmethod
+    def _in_date_range(query, start_date, end_date):
+        """Restrict an entry query to local days between start_date and end_date, inclusive"""
+        if start_date:
+            query = query.filter(JournalEntry.entry_date >= start_date)
+        if end_date:
+            query = query.filter(JournalEntry.entry_date <= end_date)
+        return query
+    
+    def get_change_version(self):
+        """Journal-wide (version, changed_at); the version grows with every entry or rollup write"""
+        state = db.session.query(JournalState.change_version, JournalState.changed_at).filter(
+            JournalState.id == 1
+        ).first()
+        return (state.change_version, state.changed_at) if state else (0, None)
+    
+    def ensure_change_version(self):
+        """Create the change version row so writers only ever update it"""
+        if db.session.get(JournalState, 1) is None:
+            db.session.add(JournalState(id=1, change_version=0, changed_at=datetime.utcnow()))
+            db.session.commit()
+    
+    def _bump_change_version(self):
+        """Advance the change version inside the caller's transaction"""
+        result = db.session.execute(
+            update(JournalState).where(JournalState.id == 1).values(
+                change_version=JournalState.change_version + 1,
+                changed_at=datetime.utcnow()
+            ).execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.session.add(JournalState(id=1, change_version=1, changed_at=datetime.utcnow()))
+    
+    def get_entry(self, entry_id):
+        """Get a single journal entry by ID"""
+        try:
+            entry = JournalEntry.query.get(entry_id)
+            if not entry:
+                return None
+            
+            return {
+                'id': entry.id,
+                'timestamp': entry.timestamp.isoformat(),
+                'date': entry.date_str,
+                'time': entry.time_str,
+                'text': entry.text,
+                'word_count': entry.word_count,
+                'reading_seconds': entry.reading_seconds,
+                'title': entry.title,
+                'ai_response': entry.ai_response_dict,
+                'insight_mode': entry.insight_mode,
+                'analysis_version': entry.analysis_version,
+                'tokens': entry.token_list,
+                'created_at': entry.created_at.isoformat(),
+                'updated_at': entry.updated_at.isoformat()
+            }
+            
+        except Exception as e:
+            logging.error(f"Error reading entry {entry_id}: {str(e)}")
+            return None
+    
     def get_entries_by_date(self, date_str):
         """Get all journal entries for a specific date"""
         try:
             target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            entries = JournalEntry.query.filter(
-                db.func.date(JournalEntry.timestamp) == target_date
-            ).order_by(JournalEntry.timestamp.desc()).all()
-            
-            result = []
-            for entry in entries:
-                result.append({
-                    'id': entry.id,
-                    'timestamp': entry.timestamp.isoformat(),
-                    'date': entry.date_str,
-                    'time': entry.time_str,
-                    'text': entry.text,
-                    'word_count': entry.word_count,
-                    'title': entry.title,
-                    'ai_response': entry.ai_response_dict,
-                    'insight_mode': entry.insight_mode,
-                    'created_at': entry.created_at.isoformat(),
-                    'updated_at': entry.updated_at.isoformat()
-                })
-            
-            return result
+            rows = db.session.query(*self._entry_columns('full')).filter(
+                JournalEntry.entry_date == target_date
+            ).order_by(JournalEntry.timestamp.desc(), JournalEntry.id.desc()).all()
+            
+            return [self._row_to_dict(row, 'full') for row in rows]
                 
         except Exception as e:
             logging.error(f"Error reading entries for {date_str}: {str(e)}")
             return []
     
-    def get_recent_entries(self, count=10):
+    def get_recent_entries(self, count=10, view='summary'):
         """Get the most recent journal entries"""
+        return self.list_entries(limit=count, view=view)['entries']
+    
+    def get_entries_needing_analysis(self, after_id=0, limit=100, outdated_only=False):
+        """Get entries with no AI response or one from an older prompt version, in id order.
+        
+        Pass the last id seen as after_id to page forward; entries that fail
+        analysis are then not retried within the same run.
+        """
         try:
-            entries = JournalEntry.query.order_by(JournalEntry.timestamp.desc()).limit(count).all()
+            outdated = db.and_(JournalEntry.ai_response.isnot(None), db.or_(
+                JournalEntry.analysis_version.is_(None),
+                JournalEntry.analysis_version < PROMPT_VERSION
+            ))
+            condition = outdated if outdated_only else db.or_(JournalEntry.ai_response.is_(None), outdated)
             
-            result = []
-            for entry in entries:
-                result.append({
-                    'id': entry.id,
-                    'timestamp': entry.timestamp.isoformat(),
-                    'date': entry.date_str,
-                    'time': entry.time_str,
-                    'text': entry.text,
-                    'word_count': entry.word_count,
-                    'title': entry.title,
-                    'ai_response': entry.ai_response_dict,
-                    'insight_mode': entry.insight_mode,
-                    'created_at': entry.created_at.isoformat()
-                })
+            rows = db.session.query(JournalEntry.id, JournalEntry.text, JournalEntry.tokens, JournalEntry.insight_mode).filter(
+                JournalEntry.id > after_id, condition
+            ).order_by(JournalEntry.id.asc()).limit(limit).all()
             
-            return result
+            return [{
+                'id': row.id,
+                'text': row.text,
+                'tokens': json.loads(row.tokens) if row.tokens else None,
+                'insight_mode': row.insight_mode
+            } for row in rows]
             
         except Exception as e:
-            logging.error(f"Error getting recent entries: {str(e)}")
+            logging.error(f"Error finding entries needing analysis: {str(e)}")
             return []
     
-    def get_all_entries(self):
-        """Get all journal entries"""
+    def list_entries(self, limit=20, cursor=None, view='summary', facets=None, start_date=None, end_date=None):
+        """Get one page of entries, newest first, using a keyset cursor.
+        
+        Returns {'entries': [...], 'next_cursor': str or None}. Pass next_cursor
+        back to get the following page; unlike OFFSET, the cost of a page does
+        not grow with how far back it is. facets and the inclusive local date
+        range narrow the listing as in get_facet_counts. Raises ValueError for
+        an unknown view or facet, or a malformed cursor.
+        """
+        if view not in ENTRY_VIEWS:
+            raise ValueError(f"Unknown entry view '{view}'")
+        position = self._decode_cursor(cursor) if cursor else None
+        matching = self._facet_filter(facets, start_date, end_date)
+        
         try:
-            entries = JournalEntry.query.order_by(JournalEntry.date.desc()).all()
+            query = self._in_date_range(db.session.query(*self._entry_columns(view)), start_date, end_date)
+            if matching is not None:
+                query = query.filter(JournalEntry.id.in_(matching))
+            if position:
+                timestamp, entry_id = position
+                # Written as a bounded range on timestamp so the index is used
+                query = query.filter(
+                    JournalEntry.timestamp <= timestamp,
+                    db.or_(JournalEntry.timestamp < timestamp, JournalEntry.id < entry_id)
+                )
+            
+            rows = query.order_by(JournalEntry.timestamp.desc(), JournalEntry.id.desc()).limit(limit + 1).all()
             
-            result = []
-            for entry in entries:
-                result.append({
-                    'date': entry.date.strftime('%Y-%m-%d'),
-                    'text': entry.text,
-                    'word_count': entry.word_count,
-                    'ai_response': entry.ai_response_dict,
-                    'insight_mode': entry.insight_mode,
-                    'created_at': entry.created_at.isoformat()
-                })
+            entries = [self._row_to_dict(row, view) for row in rows[:limit]]
+            next_cursor = self._encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+            return {'entries': entries, 'next_cursor': next_cursor}
             
-            return result
+        except Exception as e:
+            logging.error(f"Error listing entries: {str(e)}")
+            return {'entries': [], 'next_cursor': None}
+    
+    @staticmethod
+    def _entry_columns(view):
+        """Columns loaded for a listing view; 'summary' skips the body and AI payload"""
+        columns = [JournalEntry.id, JournalEntry.timestamp, JournalEntry.title,
+                   JournalEntry.word_count, JournalEntry.reading_seconds, JournalEntry.insight_mode]
+        if view == 'summary':
+            # One extra character tells us whether the preview was truncated
+            columns += [db.func.substr(JournalEntry.text, 1, PREVIEW_LENGTH + 1).label('preview'),
+                        JournalEntry.ai_response.isnot(None).label('has_analysis')]
+        else:
+            columns += [JournalEntry.text, JournalEntry.ai_response, JournalEntry.analysis_version,
+                        JournalEntry.created_at, JournalEntry.updated_at]
+        return columns
+    
+    @staticmethod
+    def _row_to_dict(row, view):
+        """Build an entry dict from a projected row"""
+        local = to_local(row.timestamp)
+        entry = {
+            'id': row.id,
+            'timestamp': row.timestamp.isoformat(),
+            'date': local.strftime('%Y-%m-%d'),
+            'time': local.strftime('%H:%M'),
+            'title': row.title,
+            'word_count': row.word_count,
+            'reading_seconds': row.reading_seconds,
+            'insight_mode': row.insight_mode
+        }
+        if view == 'summary':
+            preview = row.preview or ''
+            entry['preview'] = preview[:PREVIEW_LENGTH]
+            entry['truncated'] = len(preview) > PREVIEW_LENGTH
+            entry['has_analysis'] = bool(row.has_analysis)
+        else:
+            entry['text'] = row.text
+            entry['ai_response'] = JournalEntry.parse_ai_response(row.ai_response)
+            entry['analysis_version'] = row.analysis_version
+            entry['created_at'] = row.created_at.isoformat() if row.created_at else None
+            entry['updated_at'] = row.updated_at.isoformat() if row.updated_at else None
+        return entry
+    
+    @staticmethod
+    def _encode_cursor(row):
+        """Opaque cursor for the position after a row"""
+        position = f"{row.timestamp.isoformat()}|{row.id}"
+        return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        """Parse a cursor into (timestamp, id)"""
+        try:
+            position = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            timestamp, entry_id = position.rsplit('|', 1)
+            return datetime.fromisoformat(timestamp), int(entry_id)
+        except (ValueError, UnicodeError) as e:
+            raise ValueError(f"Invalid cursor '{cursor}'") from e
+    
+    def get_all_entries(self):
+        """Get all journal entries"""
+        try:
+            rows = db.session.query(*self._entry_columns('full')).order_by(
+                JournalEntry.timestamp.desc(), JournalEntry.id.desc()
+            ).all()
+            return [self._row_to_dict(row, 'full') for row in rows]
             
         except Exception as e:
             logging.error(f"Error getting all entries: {str(e)}")
             return []
     
+    def iter_entries(self, batch_size=500, fields=None):
+        """Yield entries oldest first as EntryRecords, fetching batch_size rows at a time.
+        
+        Only the columns behind the requested fields (default: all of
+        ENTRY_FIELDS) are selected, and the AI response JSON is decoded only
+        when a record's 'ai_response' is read, so memory stays bounded
+        however long the journal is.
+        """
+        fields = tuple(fields or ENTRY_FIELDS)
+        unknown = [field for field in fields if field not in ENTRY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown entry fields: {', '.join(unknown)}")
+        
+        columns = {column.key: column for field in fields for column in ENTRY_FIELDS[field][0]}
+        rows = db.session.query(*columns.values()).order_by(
+            JournalEntry.timestamp.asc(), JournalEntry.id.asc()
+        ).execution_options(yield_per=batch_size)
+        for row in rows:
+            yield EntryRecord(row, fields)
+    
     def get_entries_in_range(self, start_date, end_date):
-        """Get entries within a date range"""
+        """Get entries within a date range (inclusive, journal-local days)"""
         try:
             start = datetime.strptime(start_date, '%Y-%m-%d').date()
             end = datetime.strptime(end_date, '%Y-%m-%d').date()
             
-            entries = JournalEntry.query.filter(
-                JournalEntry.date >= start,
-                JournalEntry.date <= end
-            ).order_by(JournalEntry.date.desc()).all()
-            
-            result = []
-            for entry in entries:
-                result.append({
-                    'date': entry.date.strftime('%Y-%m-%d'),
-                    'text': entry.text,
-                    'word_count': entry.word_count,
-                    'ai_response': entry.ai_response_dict,
-                    'insight_mode': entry.insight_mode,
-                    'created_at': entry.created_at.isoformat()
-                })
-            
-            return result
+            rows = db.session.query(*self._entry_columns('full')).filter(
+                JournalEntry.entry_date >= start,
+                JournalEntry.entry_date <= end
+            ).order_by(JournalEntry.timestamp.desc(), JournalEntry.id.desc()).all()
+            return [self._row_to_dict(row, 'full') for row in rows]
             
         except Exception as e:
             logging.error(f"Error getting entries in range: {str(e)}")
             return []
     
+    def search(self, query, limit=20, offset=0):
+        """Full-text search over entry titles and text, best matches first.
+        
+        Returns {'results': [...], 'has_more': bool}; each result carries an
+        HTML-safe 'snippet' with matches wrapped in <mark>.
+        """
+        terms = re.findall(r'\w+', query or '')
+        if not terms:
+            return {'results': [], 'has_more': False}
+        
+        try:
+            if db.engine.dialect.name == 'sqlite':
+                rows = self._search_sqlite(terms, limit + 1, offset)
+            elif db.engine.dialect.name == 'postgresql':
+                rows = self._search_tsvector(terms, limit + 1, offset)
+            else:
+                rows = self._search_like(terms, limit + 1, offset)
+            
+            results = [{
+                'id': row.id,
+                'timestamp': row.timestamp.isoformat(),
+                'date': to_local(row.timestamp).strftime('%Y-%m-%d'),
+                'time': to_local(row.timestamp).strftime('%H:%M'),
+                'title': row.title,
+                'word_count': row.word_count,
+                'snippet': self._highlight(row.snippet)
+            } for row in rows[:limit]]
+            
+            return {'results': results, 'has_more': len(rows) > limit}
+            
+        except Exception as e:
+            logging.error(f"Error searching entries for '{query}': {str(e)}")
+            return {'results': [], 'has_more': False}
+    
+    def _search_sqlite(self, terms, limit, offset):
+        """FTS5 search, or the LIKE fallback when the FTS index is missing or unusable"""
+        has_index = db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'journal_entries_fts'"
+        )).first() is not None
+        
+        if has_index:
+            try:
+                return self._search_fts(terms, limit, offset)
+            except OperationalError as e:
+                db.session.rollback()
+                logging.warning(f"FTS search failed, falling back to LIKE: {str(e)}")
+        return self._search_like(terms, limit, offset)
+    
+    def _search_fts(self, terms, limit, offset):
+        """Ranked FTS5 query; every term must match, the last one as a prefix"""
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        
+        return db.session.execute(text(f"""
+            SELECT e.id, e.timestamp, e.title, e.word_count,
+                   snippet(journal_entries_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 24) AS snippet
+            FROM journal_entries_fts
+            JOIN journal_entries e ON e.id = journal_entries_fts.rowid
+            WHERE journal_entries_fts MATCH :match
+            ORDER BY bm25(journal_entries_fts, 2.0, 1.0)
+            LIMIT :limit OFFSET :offset
+        """).columns(timestamp=db.DateTime), {'match': ' '.join(quoted), 'limit': limit, 'offset': offset}).all()
+    
+    def _search_tsvector(self, terms, limit, offset):
+        """Ranked Postgres text search; every term must match, the last one as a prefix"""
+        match = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        options = (f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_END}", '
+                   'MaxWords=24, MinWords=12, MaxFragments=1, FragmentDelimiter="…"')
+        
+        # Headlines re-parse the whole text, so only build them for the page of hits
+        return db.session.execute(text(f"""
+            SELECT id, timestamp, title, word_count, ts_headline('english', text, query, :options) AS snippet
+            FROM (
+                SELECT e.id, e.timestamp, e.title, e.word_count, e.text, q.query,
+                       ts_rank({POSTGRES_SEARCH_DOCUMENT}, q.query) AS rank
+                FROM journal_entries e, to_tsquery('english', :match) AS q(query)
+                WHERE {POSTGRES_SEARCH_DOCUMENT} @@ q.query
+                ORDER BY rank DESC, e.id DESC
+                LIMIT :limit OFFSET :offset
+            ) hits
+            ORDER BY rank DESC, id DESC
+        """).columns(timestamp=db.DateTime), {'match': match, 'options': options, 'limit': limit, 'offset': offset}).all()
+    
+    def _search_like(self, terms, limit, offset):
+        """Unranked fallback for databases without an FTS index"""
+        query = db.session.query(
+            JournalEntry.id, JournalEntry.timestamp, JournalEntry.title, JournalEntry.word_count,
+            db.func.substr(JournalEntry.text, 1, 200).label('snippet')
+        )
+        for term in terms:
+            query = query.filter(JournalEntry.text.ilike(f'%{term}%') | JournalEntry.title.ilike(f'%{term}%'))
+        return query.order_by(JournalEntry.timestamp.desc()).limit(limit).offset(offset).all()
+    
+    def _highlight(self, snippet):
+        """Escape a snippet and turn highlight markers into <mark> tags"""
+        escaped = str(escape(snippet or ''))
+        return Markup(escaped.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+    
     def get_entry_stats(self):
         """Get statistics about journal entries"""
         try:
-            total_entries = JournalEntry.query.count()
-            total_words = db.session.query(db.func.sum(JournalEntry.word_count)).scalar() or 0
+            total_entries, total_words, first_date, last_date = db.session.query(
+                db.func.count(JournalEntry.id),
+                db.func.sum(JournalEntry.word_count),
+                db.func.min(JournalEntry.entry_date),
+                db.func.max(JournalEntry.entry_date)
+            ).one()
+            total_words = total_words or 0
             avg_words = total_words / total_entries if total_entries > 0 else 0
             
-            # Get date range
-            first_entry = JournalEntry.query.order_by(JournalEntry.date.asc()).first()
-            last_entry = JournalEntry.query.order_by(JournalEntry.date.desc()).first()
-            
             return {
                 'total_entries': total_entries,
                 'total_words': total_words,
                 'avg_words_per_entry': round(avg_words, 1),
-                'first_entry_date': first_entry.date.strftime('%Y-%m-%d') if first_entry else None,
-                'last_entry_date': last_entry.date.strftime('%Y-%m-%d') if last_entry else None
+                'first_entry_date': first_date.strftime('%Y-%m-%d') if first_date else None,
+                'last_entry_date': last_date.strftime('%Y-%m-%d') if last_date else None
             }
             
         except Exception as e:
@@ -217,31 +864,197 @@ class DatabaseJournalService:
                 'last_entry_date': None
             }
     
-    def store_analytics_data(self, date_str, emotion_data, theme_data, sentiment_score):
+    def store_analytics_data(self, date_str, emotion_data, theme_data, sentiment_score, entry_count=0, word_count=0):
         """Store analytics data for a specific date"""
         try:
             entry_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            self._upsert_analytics(entry_date, emotion_data, theme_data, sentiment_score, entry_count, word_count)
+            self._update_writing_streaks(entry_date)
             
-            # Check if analytics data already exists
-            existing_data = AnalyticsData.query.filter_by(date=entry_date).first()
+            db.session.commit()
+            logging.info(f"Stored analytics data for {date_str}")
             
-            if existing_data:
-                existing_data.emotions = emotion_data
-                existing_data.themes = theme_data
-                existing_data.sentiment_score = sentiment_score
-            else:
+        except Exception as e:
+            logging.error(f"Error storing analytics data: {str(e)}")
+            db.session.rollback()
+            raise
+    
+    def _refresh_rollups(self, days):
+        """Recompute the rollups and streaks of changed days inside the caller's transaction.
+        
+        Runs in a savepoint: rollups are derived data, so a failure here is
+        logged and undone without losing the entry write it accompanies.
+        """
+        days = sorted(set(days))
+        if not days:
+            return
+        try:
+            with db.session.begin_nested():
+                by_day = defaultdict(list)
+                entries = db.session.query(JournalEntry.entry_date, *self._rollup_columns()).filter(
+                    JournalEntry.entry_date.in_(days)
+                )
+                for entry in entries:
+                    by_day[entry.entry_date].append(self._rollup_input(entry))
+                
+                existing = {row.date: row for row in AnalyticsData.query.filter(AnalyticsData.date.in_(days))}
+                for day in days:
+                    row = existing.get(day)
+                    if not by_day[day]:
+                        if row:
+                            db.session.delete(row)
+                        continue
+                    
+                    summary = self.pattern_analyzer.summarize_entries(by_day[day])
+                    if row is None:
+                        row = AnalyticsData(date=day)
+                        db.session.add(row)
+                    row.emotions = summary['emotions']
+                    row.themes = summary['themes']
+                    row.sentiment_score = summary['sentiment']
+                    row.entry_count = summary['entry_count']
+                    row.word_count = summary['word_count']
+                
+                db.session.flush()
+                if len(days) == 1:
+                    # A single changed day only moves the streaks of its own run
+                    self._update_writing_streaks(days[0])
+                else:
+                    self._recompute_streaks_from(days[0])
+            
+        except Exception as e:
+            logging.error(f"Error refreshing analytics for {len(days)} days: {str(e)}")
+    
+    def rebuild_analytics(self):
+        """Rebuild every daily rollup from scratch"""
+        try:
+            AnalyticsData.query.delete(synchronize_session=False)
+            
+            # Entries arrive grouped by day, so only one day's entries are held at a time
+            entries = db.session.query(JournalEntry.entry_date, *self._rollup_columns()).order_by(
+                JournalEntry.entry_date.asc(), JournalEntry.timestamp.asc()
+            ).yield_per(500)
+            
+            day_count = 0
+            streak = 0
+            previous_day = None
+            for day, day_entries in groupby(entries, key=lambda entry: entry.entry_date):
+                summary = self.pattern_analyzer.summarize_entries([self._rollup_input(entry) for entry in day_entries])
+                streak = streak + 1 if previous_day and (day - previous_day).days == 1 else 1
+                previous_day = day
+                day_count += 1
+                
                 analytics_data = AnalyticsData(
-                    date=entry_date,
-                    sentiment_score=sentiment_score
+                    date=day,
+                    sentiment_score=summary['sentiment'],
+                    writing_streak=streak,
+                    entry_count=summary['entry_count'],
+                    word_count=summary['word_count']
                 )
-                analytics_data.emotions = emotion_data
-                analytics_data.themes = theme_data
+                analytics_data.emotions = summary['emotions']
+                analytics_data.themes = summary['themes']
                 db.session.add(analytics_data)
             
+            self._bump_change_version()
             db.session.commit()
-            logging.info(f"Stored analytics data for {date_str}")
+            logging.info(f"Rebuilt analytics for {day_count} days")
+            return day_count
             
         except Exception as e:
-            logging.error(f"Error storing analytics data: {str(e)}")
+            logging.error(f"Error rebuilding analytics: {str(e)}")
             db.session.rollback()
-            raise
\ No newline at end of file
+            raise
+    
+    def ensure_analytics(self):
+        """Build rollups for journals that predate materialized analytics"""
+        if AnalyticsData.query.first() is None and JournalEntry.query.first() is not None:
+            self.rebuild_analytics()
+    
+    def get_daily_analytics(self, start_date=None, end_date=None):
+        """Get per-day analytics rollups, oldest first"""
+        try:
+            query = AnalyticsData.query
+            if start_date:
+                query = query.filter(AnalyticsData.date >= start_date)
+            if end_date:
+                query = query.filter(AnalyticsData.date <= end_date)
+            
+            return [row.to_dict() for row in query.order_by(AnalyticsData.date.asc()).all()]
+            
+        except Exception as e:
+            logging.error(f"Error getting daily analytics: {str(e)}")
+            return []
+    
+    @staticmethod
+    def _rollup_columns():
+        """Entry columns rollups are built from; the write-time keyword counts stand in for the text"""
+        return (JournalEntry.keyword_counts, JournalEntry.sentiment_score, JournalEntry.word_count)
+    
+    @staticmethod
+    def _rollup_input(row):
+        """summarize_entries input for a row of _rollup_columns"""
+        return {
+            'keyword_counts': json.loads(row.keyword_counts) if row.keyword_counts else {},
+            'sentiment_score': row.sentiment_score or 0,
+            'word_count': row.word_count or 0
+        }
+    
+    def _upsert_analytics(self, day, emotion_data, theme_data, sentiment_score, entry_count, word_count):
+        """Insert or update the rollup row for a day (caller commits)"""
+        analytics_data = AnalyticsData.query.filter_by(date=day).first()
+        if not analytics_data:
+            analytics_data = AnalyticsData(date=day)
+            db.session.add(analytics_data)
+        
+        analytics_data.emotions = emotion_data
+        analytics_data.themes = theme_data
+        analytics_data.sentiment_score = sentiment_score
+        analytics_data.entry_count = entry_count
+        analytics_data.word_count = word_count
+        return analytics_data
+    
+    def _recompute_streaks_from(self, day):
+        """Recompute every streak from a day onwards (caller flushes and commits)"""
+        previous = AnalyticsData.query.filter(AnalyticsData.date < day).order_by(AnalyticsData.date.desc()).first()
+        streak = previous.writing_streak or 1 if previous else 0
+        expected_day = previous.date + timedelta(days=1) if previous else None
+        
+        for row in AnalyticsData.query.filter(AnalyticsData.date >= day).order_by(AnalyticsData.date.asc()):
+            streak = streak + 1 if row.date == expected_day else 1
+            row.writing_streak = streak
+            expected_day = row.date + timedelta(days=1)
+    
+    def _update_writing_streaks(self, day, batch_size=64):
+        """Recompute streak lengths from a changed day through the end of its run (caller commits).
+        
+        Stops at the first gap or at the first later day whose streak is
+        already right, since every day after it is then unchanged as well.
+        """
+        db.session.flush()
+        
+        previous = AnalyticsData.query.filter_by(date=day - timedelta(days=1)).first()
+        streak = previous.writing_streak or 1 if previous else 0
+        
+        expected_day = day
+        after = day - timedelta(days=1)
+        while True:
+            rows = AnalyticsData.query.filter(AnalyticsData.date > after).order_by(
+                AnalyticsData.date.asc()
+            ).limit(batch_size).all()
+            if not rows:
+                return
+            
+            for row in rows:
+                if row.date != expected_day:
+                    # Without a rollup for the changed day, the run after it starts over
+                    if expected_day == day and row.date == day + timedelta(days=1):
+                        streak = 0
+                    else:
+                        return
+                
+                streak += 1
+                if row.date != day and row.writing_streak == streak:
+                    return
+                row.writing_streak = streak
+                expected_day = row.date + timedelta(days=1)
+            after = rows[-1].date
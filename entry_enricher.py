@@ -0,0 +1,80 @@
+"""
+Write-time enrichment of journal entries
+
+Everything derived from an entry's text alone is computed once when the
+text is saved and stored on the entry, so rollups and insights read the
+stored values instead of re-tokenizing and re-scoring the text.
+"""
+import json
+import math
+import re
+from collections import Counter
+from config import Config
+from lexicon import WORD_PATTERN
+
+# Bump when the derived fields or the analyzer's keyword lists change so stored values are recomputed
+# (2: tokens are stored again, for rule-based analysis)
+ENRICHMENT_VERSION = 2
+
+# (entries with fewer words than this, length class); anything longer is 'long'
+LENGTH_CLASSES = ((100, 'short'), (400, 'medium'))
+
+SENTENCE_END = re.compile(r'[.!?]+(?=\s|$)')
+
+# Frequent English function words; their share of an entry's words is the language hint
+ENGLISH_FUNCTION_WORDS = frozenset([
+    'a', 'about', 'after', 'all', 'am', 'an', 'and', 'are', 'as', 'at', 'be', 'because', 'been', 'but',
+    'by', 'can', 'did', 'do', 'for', 'from', 'had', 'has', 'have', 'he', 'her', 'him', 'his', 'how', 'i',
+    'if', 'in', 'is', 'it', 'just', 'me', 'my', 'not', 'of', 'on', 'or', 'out', 'she', 'so', 'that',
+    'the', 'their', 'them', 'then', 'there', 'they', 'this', 'to', 'up', 'was', 'we', 'were', 'what',
+    'when', 'which', 'who', 'will', 'with', 'would', 'you', 'your'
+])
+ENGLISH_MIN_SHARE = 0.2
+LANGUAGE_MIN_WORDS = 5
+
+class EntryEnricher:
+    """Derives the stored per-entry fields from an entry's text"""
+
+    def __init__(self, pattern_analyzer, words_per_minute=None):
+        self.pattern_analyzer = pattern_analyzer
+        self.words_per_minute = max(words_per_minute or Config.WORDS_PER_MINUTE_READING, 1)
+
+    def enrich(self, text):
+        """JournalEntry column values derived from text, JSON fields already encoded"""
+        text = text or ''
+        words = text.split()
+        # Lower-cased once; the distinct words feed the keyword scan, the counts the language hint
+        word_counts = Counter(WORD_PATTERN.findall(text.lower()))
+        tokens = sorted(word_counts)
+        scored = self.pattern_analyzer.score_tokens(tokens, len(words))
+
+        return {
+            'word_count': len(words),
+            'tokens': json.dumps(tokens),
+            'keyword_counts': json.dumps(scored['keyword_counts']),
+            'sentiment_score': scored['sentiment'],
+            'reading_seconds': math.ceil(len(words) * 60 / self.words_per_minute),
+            'text_profile': json.dumps(self.profile(text, words, word_counts)),
+            'enrichment_version': ENRICHMENT_VERSION
+        }
+
+    def profile(self, text, words, word_counts):
+        """Length class, sentence and vocabulary statistics and a language hint"""
+        length = next((name for limit, name in LENGTH_CLASSES if len(words) < limit), 'long')
+
+        # The hint only distinguishes English, which the keyword lists are written in, from anything else
+        language = None
+        total = sum(word_counts.values())
+        if total >= LANGUAGE_MIN_WORDS:
+            function_words = sum(word_counts[word] for word in ENGLISH_FUNCTION_WORDS.intersection(word_counts))
+            language = 'en' if function_words / total >= ENGLISH_MIN_SHARE else 'other'
+
+        return {
+            'length': length,
+            'characters': len(text),
+            'sentences': len(SENTENCE_END.findall(text)) or (1 if words else 0),
+            'unique_words': len(word_counts),
+            'lexical_diversity': round(len(word_counts) / total, 3) if total else 0,
+            'avg_word_length': round(sum(map(len, words)) / len(words), 1) if words else 0,
+            'language': language
+        }
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Export the whole journal as JSONL, CSV or Markdown
+
+Entries are streamed from the database in batches, so memory use does not
+grow with the size of the journal. JSONL exports can be imported again with
+import_entries.py.
+
+Usage: python export_entries.py [--format jsonl|csv|markdown] [--gzip] [-o FILE]
+"""
+import argparse
+import sys
+from app import app, journal_service
+from journal_exporter import EXPORT_FORMATS, export_chunks, export_filename
+from local_time import local_today
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='jsonl')
+    parser.add_argument('--gzip', action='store_true', help='gzip the output')
+    parser.add_argument('-o', '--output', help="output file ('-' for stdout; default selfscope-DATE.EXT)")
+    args = parser.parse_args()
+
+    output = args.output or export_filename(args.format, local_today(), args.gzip)
+    with app.app_context():
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in export_chunks(journal_service.iter_entries(), args.format, args.gzip):
+                stream.write(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+
+    if output != '-':
+        print(f"Exported journal to {output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
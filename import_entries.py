@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Import a journal archive into SelfScope
+
+Accepts a JSON Lines file, a folder of Markdown files, or the legacy
+journal_entries/ directory of YYYY-MM-DD.json files. Entries already in the
+journal (same timestamp and text) are skipped, so an import can be re-run.
+
+Usage: python import_entries.py PATH [--format jsonl|markdown|legacy] [--batch-size N]
+"""
+import argparse
+import sys
+from app import app, journal_service
+from journal_importer import JournalImporter, READERS
+
+def report(stats):
+    print(f"  {stats['imported']} imported, {stats['skipped']} duplicates skipped, "
+          f"{stats['invalid']} invalid ({stats['entries_per_second']:.0f} entries/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help='archive file or directory')
+    parser.add_argument('--format', choices=sorted(READERS), help='archive format (detected when omitted)')
+    parser.add_argument('--batch-size', type=int, default=500, help='entries per transaction')
+    args = parser.parse_args()
+
+    with app.app_context():
+        importer = JournalImporter(journal_service, batch_size=args.batch_size)
+        try:
+            stats = importer.import_path(args.path, fmt=args.format, progress=report)
+        except ValueError as e:
+            print(f"✗ {str(e)}")
+            return 1
+
+    print(f"\nImported {stats['imported']} of {stats['read']} entries in {stats['elapsed']:.1f}s "
+          f"({stats['entries_per_second']:.0f} entries/s)")
+    if stats['imported']:
+        print("Run backfill_analysis.py to add AI insights to the imported entries.")
+    return 1 if stats['invalid'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Streaming export of the journal
+
+Writers turn an iterable of entry dicts into text pieces; export_chunks joins
+them into blocks and optionally gzips them, so memory use stays flat however
+large the journal is.
+"""
+import csv
+import io
+import json
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+CSV_FIELDS = ['id', 'timestamp', 'date', 'time', 'title', 'text', 'word_count', 'insight_mode',
+              'insight', 'reflection', 'question', 'archetype', 'ai_response']
+
+def export_record(entry):
+    """The portable form of an entry, readable by journal_importer"""
+    return {
+        'id': entry['id'],
+        # Stored timestamps are naive UTC; mark them so imports elsewhere are unambiguous
+        'timestamp': entry['timestamp'] + 'Z',
+        'date': entry['date'],
+        'title': entry['title'],
+        'text': entry['text'],
+        'word_count': entry['word_count'],
+        'insight_mode': entry['insight_mode'],
+        'ai_response': entry['ai_response'] or None,
+        'analysis_version': entry.get('analysis_version'),
+        'created_at': entry['created_at'] + 'Z' if entry['created_at'] else None
+    }
+
+def write_jsonl(entries):
+    for entry in entries:
+        yield json.dumps(export_record(entry), ensure_ascii=False) + '\n'
+
+def write_csv(entries):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    yield buffer.getvalue()
+
+    for entry in entries:
+        buffer.seek(0)
+        buffer.truncate()
+        ai_response = entry['ai_response'] or {}
+        writer.writerow([
+            entry['id'], entry['timestamp'] + 'Z', entry['date'], entry['time'], entry['title'] or '',
+            entry['text'], entry['word_count'], entry['insight_mode'],
+            ai_response.get('insight', ''), ai_response.get('reflection', ''),
+            ai_response.get('question', ''), ai_response.get('archetype', ''),
+            json.dumps(ai_response, ensure_ascii=False) if ai_response else ''
+        ])
+        yield buffer.getvalue()
+
+def write_markdown(entries):
+    yield '# SelfScope Journal\n'
+    for entry in entries:
+        heading = f"{entry['date']} {entry['time']}"
+        if entry['title']:
+            heading += f" - {entry['title']}"
+        parts = [f"\n## {heading}\n\n{entry['text'].strip()}\n"]
+
+        ai_response = entry['ai_response'] or {}
+        insights = [(label, ai_response.get(key)) for label, key in
+                    (('Insight', 'insight'), ('Reflection', 'reflection'), ('Question', 'question'))]
+        quoted = [f"> **{label}:** {value}" for label, value in insights if value]
+        if quoted:
+            parts.append('\n' + '\n>\n'.join(quoted) + '\n')
+        yield ''.join(parts)
+
+# format: (mimetype, file extension, writer)
+EXPORT_FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl', write_jsonl),
+    'csv': ('text/csv', 'csv', write_csv),
+    'markdown': ('text/markdown', 'md', write_markdown)
+}
+
+def export_chunks(entries, fmt, compress=False):
+    """Yield the export as bytes in blocks of about CHUNK_SIZE, gzipped if compress"""
+    writer = EXPORT_FORMATS[fmt][2]
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 writes a gzip container
+
+    pieces = []
+    size = 0
+    for piece in writer(entries):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            data = ''.join(pieces).encode('utf-8')
+            pieces = []
+            size = 0
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+
+    data = ''.join(pieces).encode('utf-8')
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+def export_filename(fmt, day, compress=False):
+    """Download file name for an export made on day"""
+    name = f"selfscope-{day.strftime('%Y-%m-%d')}.{EXPORT_FORMATS[fmt][1]}"
+    return name + '.gz' if compress else name
@@ -0,0 +1,214 @@
+"""
+Bulk import of journal archives
+
+Readers stream (source, fields) pairs from JSONL files, folders of Markdown
+files, or the legacy JSON-per-day directory written by JournalService. The
+importer normalizes them and inserts them in batched transactions.
+"""
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, time as dt_time
+from local_time import to_utc
+
+# 2024-03-05, optionally followed by a time such as 2024-03-05T0830, 2024-03-05_08-30 or 2024-03-05 08:30
+FILENAME_DATE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})(?:[T _-](\d{2})[:-]?(\d{2}))?')
+LEGACY_FILENAME_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}\.json$')
+
+def read_jsonl(path):
+    """Yield one entry per line of a JSON Lines file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            source = f"{path}:{line_number}"
+            try:
+                fields = json.loads(line)
+                if not isinstance(fields, dict):
+                    raise ValueError("expected a JSON object")
+                yield source, fields
+            except ValueError as e:
+                logging.warning(f"Skipping {source}: {str(e)}")
+                yield source, None
+
+def read_legacy_directory(path):
+    """Yield entries from a JournalService directory of YYYY-MM-DD.json files"""
+    for filename in sorted(os.listdir(path)):
+        if not LEGACY_FILENAME_PATTERN.match(filename):
+            continue
+        source = os.path.join(path, filename)
+        try:
+            with open(source, 'r', encoding='utf-8') as f:
+                fields = json.load(f)
+            fields.setdefault('date', filename[:-len('.json')])
+            yield source, fields
+        except ValueError as e:
+            logging.warning(f"Skipping {source}: {str(e)}")
+            yield source, None
+
+def read_markdown_folder(path):
+    """Yield one entry per Markdown file, dated by front matter or file name.
+
+    Front matter is an optional block of 'key: value' lines between '---'
+    lines (date, time, timestamp, title). Without a title there, a leading
+    '# Heading' becomes the title.
+    """
+    for directory, _, filenames in sorted(os.walk(path)):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(('.md', '.markdown')):
+                continue
+            source = os.path.join(directory, filename)
+            try:
+                with open(source, 'r', encoding='utf-8') as f:
+                    yield source, parse_markdown(f.read(), filename)
+            except (ValueError, UnicodeDecodeError) as e:
+                logging.warning(f"Skipping {source}: {str(e)}")
+                yield source, None
+
+def parse_markdown(content, filename=''):
+    """Split a Markdown entry into fields"""
+    fields = {}
+    lines = content.lstrip('\ufeff').splitlines()
+
+    if lines and lines[0].strip() == '---':
+        try:
+            end = lines.index('---', 1)
+        except ValueError:
+            raise ValueError("unterminated front matter")
+        for line in lines[1:end]:
+            key, sep, value = line.partition(':')
+            if sep:
+                fields[key.strip().lower()] = value.strip().strip('"\'')
+        lines = lines[end + 1:]
+
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    if lines and lines[0].startswith('# ') and 'title' not in fields:
+        fields['title'] = lines.pop(0)[2:].strip()
+
+    if 'timestamp' not in fields and 'date' not in fields:
+        match = FILENAME_DATE_PATTERN.match(filename)
+        if not match:
+            raise ValueError("no date in front matter or file name")
+        fields['date'] = match.group(1)
+        if match.group(2):
+            fields.setdefault('time', f"{match.group(2)}:{match.group(3)}")
+
+    fields['text'] = '\n'.join(lines).strip()
+    return fields
+
+READERS = {
+    'jsonl': read_jsonl,
+    'markdown': read_markdown_folder,
+    'legacy': read_legacy_directory
+}
+
+def detect_format(path):
+    """Guess the archive format from a path"""
+    if os.path.isfile(path):
+        if path.endswith(('.jsonl', '.ndjson')):
+            return 'jsonl'
+        raise ValueError(f"Unrecognized archive file '{path}'")
+    if not os.path.isdir(path):
+        raise ValueError(f"No such file or directory '{path}'")
+    if any(LEGACY_FILENAME_PATTERN.match(name) for name in os.listdir(path)):
+        return 'legacy'
+    return 'markdown'
+
+def parse_timestamp(value):
+    """Parse an ISO timestamp; naive values are taken as journal-local time"""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return to_utc(datetime.fromisoformat(value))
+
+class JournalImporter:
+    """Stream entries from an archive into the database in batched transactions"""
+
+    def __init__(self, journal_service, batch_size=500):
+        self.journal_service = journal_service
+        self.batch_size = batch_size
+
+    def import_path(self, path, fmt=None, progress=None):
+        """Import an archive; fmt is 'jsonl', 'markdown' or 'legacy' (detected when omitted)"""
+        fmt = fmt or detect_format(path)
+        if fmt not in READERS:
+            raise ValueError(f"Unknown import format '{fmt}'")
+        return self.import_records(READERS[fmt](path), progress)
+
+    def import_records(self, records, progress=None):
+        """Import (source, fields) pairs, committing once per batch.
+
+        progress, if given, is called with the running stats after each batch.
+        Returns stats with read, imported, skipped (duplicates), invalid,
+        elapsed seconds and entries_per_second.
+        """
+        stats = {'read': 0, 'imported': 0, 'skipped': 0, 'invalid': 0}
+        started = time.perf_counter()
+        batch = []
+
+        for source, fields in records:
+            stats['read'] += 1
+            entry = self._normalize(source, fields)
+            if entry is None:
+                stats['invalid'] += 1
+                continue
+
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self._flush(batch, stats, started, progress)
+                batch = []
+
+        if batch:
+            self._flush(batch, stats, started, progress)
+        self._update_rate(stats, started)
+        return stats
+
+    def _flush(self, batch, stats, started, progress):
+        imported, skipped = self.journal_service.save_entries(batch)
+        stats['imported'] += imported
+        stats['skipped'] += skipped
+        if progress:
+            progress(self._update_rate(stats, started))
+
+    @staticmethod
+    def _update_rate(stats, started):
+        stats['elapsed'] = time.perf_counter() - started
+        stats['entries_per_second'] = stats['imported'] / stats['elapsed'] if stats['elapsed'] else 0
+        return stats
+
+    @staticmethod
+    def _normalize(source, fields):
+        """Turn reader fields into a save_entries dict, or None if unusable"""
+        if fields is None:
+            return None
+        try:
+            text = fields.get('text')
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError("missing text")
+
+            if fields.get('timestamp'):
+                timestamp = parse_timestamp(fields['timestamp'])
+            elif fields.get('date'):
+                # Date-only entries land at local noon (or their given time) so they stay on that day
+                day = datetime.strptime(fields['date'], '%Y-%m-%d').date()
+                clock = dt_time.fromisoformat(fields['time']) if fields.get('time') else dt_time(12)
+                timestamp = to_utc(datetime.combine(day, clock))
+            else:
+                raise ValueError("missing timestamp or date")
+
+            ai_response = fields.get('ai_response')
+            return {
+                'timestamp': timestamp,
+                'text': text.strip(),
+                'title': (fields.get('title') or '').strip() or None,
+                'ai_response': ai_response if isinstance(ai_response, dict) else None,
+                'insight_mode': fields.get('insight_mode'),
+                'analysis_version': fields.get('analysis_version'),
+                'created_at': parse_timestamp(fields['created_at']) if fields.get('created_at') else None
+            }
+
+        except (ValueError, TypeError) as e:
+            logging.warning(f"Skipping {source}: {str(e)}")
+            return None
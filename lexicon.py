@@ -0,0 +1,91 @@
+"""
+Keyword lexicon shared by the pattern analyzer and rule-based AI
+"""
+import re
+from collections import defaultdict
+
+# Inflections accepted after a keyword so "friend" still matches "friends"
+# and "learn" matches "learning", while "down" no longer matches "download"
+KEYWORD_SUFFIXES = ['s', 'es', 'd', 'ed', 'ing', 'ly']
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Distinct words remembered by each lexicon; journal vocabularies stay well below this
+TOKEN_CACHE_SIZE = 100000
+
+class Lexicon:
+    """Keyword groups matched against each word of a text in one pass.
+
+    groups maps a group name to {category: [keywords]}, e.g.
+    {'emotion': {'joy': ['happy', ...]}, 'theme': {...}}. A keyword may belong
+    to several categories and groups; each is credited from the same match.
+    """
+
+    def __init__(self, groups):
+        self.groups = {group: {category: list(keywords) for category, keywords in categories.items()}
+                       for group, categories in groups.items()}
+        self._targets = defaultdict(set)  # keyword -> {(group, category)}
+
+        for group, categories in self.groups.items():
+            for category, keywords in categories.items():
+                for keyword in keywords:
+                    self._targets[keyword.lower()].add((group, category))
+
+        # Shortest suffix first, so the longest keyword a word starts with wins
+        self._suffixes = sorted(KEYWORD_SUFFIXES, key=len)
+        self._token_cache = {}
+
+    def match_word(self, word):
+        """Get the keyword a lower-cased word is (or inflects), or None"""
+        try:
+            return self._token_cache[word]
+        except KeyError:
+            pass
+
+        keyword = word if word in self._targets else None
+        if keyword is None:
+            for suffix in self._suffixes:
+                if word.endswith(suffix) and word[:-len(suffix)] in self._targets:
+                    keyword = word[:-len(suffix)]
+                    break
+
+        if len(self._token_cache) < TOKEN_CACHE_SIZE:
+            self._token_cache[word] = keyword
+        return keyword
+
+    def find_keywords(self, text):
+        """Get the set of distinct keywords present in text"""
+        if not text:
+            return set()
+        return self.keywords_in(set(WORD_PATTERN.findall(text.lower())))
+
+    def keywords_in(self, tokens):
+        """Get the set of distinct keywords among lower-cased words"""
+        # A keyword only counts as a whole word, so each distinct word is looked up on its own
+        cache = self._token_cache
+        keywords = {cache[word] if word in cache else self.match_word(word) for word in tokens}
+        keywords.discard(None)
+        return keywords
+
+    def scan(self, text):
+        """Count distinct matched keywords per category for every group in one pass.
+
+        Returns {group: {category: count}} containing only categories with hits.
+        """
+        return self._count(self.find_keywords(text))
+
+    def scan_tokens(self, tokens):
+        """scan() over the distinct lower-cased words (WORD_PATTERN matches) of a text"""
+        return self._count(self.keywords_in(tokens))
+
+    def _count(self, keywords):
+        hits = defaultdict(int)
+        for keyword in keywords:
+            for target in self._targets[keyword]:
+                hits[target] += 1
+
+        # Keep categories in definition order so ties resolve the same way every run
+        return {
+            group: {category: hits[(group, category)] for category in categories if (group, category) in hits}
+            for group, categories in self.groups.items()
+        }
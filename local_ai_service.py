@@ -1,12 +1,23 @@
 import json
 import logging
-import requests
+import threading
 import re
 from collections import Counter
 from datetime import datetime
+from types import MappingProxyType
+from ai_health_monitor import BackendHealthMonitor
+from ai_http_client import BackendClient
+from config import Config
+from lexicon import Lexicon
+
+# Bump whenever prompts or response handling change so cached and stored analyses can be told apart
+PROMPT_VERSION = 1
+
+# Config key holding each model backend's base URL
+BACKEND_URL_KEYS = {'lm_studio': 'lm_studio_url', 'ollama': 'ollama_url', 'openai_compatible': 'custom_url'}
 
 class LocalAIService:
-    def __init__(self):
+    def __init__(self, start_monitor=True):
         self.config = {
             'endpoint_type': 'ollama',  # ollama, lm_studio, openai_compatible
             'ollama_url': "http://localhost:11434",
@@ -17,90 +28,259 @@ class LocalAIService:
         }
         self.available_models = []
         self.current_endpoint = None
-        self.check_available_services()
+        
+        # One keep-alive connection pool per backend URL
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+        
+        self.emotion_keywords = {
+            'joy': ['happy', 'joy', 'excited', 'elated', 'cheerful', 'delighted', 'thrilled', 'glad', 'content'],
+            'sadness': ['sad', 'depressed', 'down', 'melancholy', 'blue', 'gloomy', 'sorrowful', 'upset', 'disappointed'],
+            'anger': ['angry', 'mad', 'furious', 'irritated', 'annoyed', 'frustrated', 'livid', 'outraged'],
+            'fear': ['afraid', 'scared', 'anxious', 'worried', 'nervous', 'fearful', 'terrified', 'concerned'],
+            'love': ['love', 'affection', 'adore', 'cherish', 'devoted', 'fond', 'caring', 'tender'],
+            'gratitude': ['grateful', 'thankful', 'blessed', 'appreciative', 'indebted'],
+            'hope': ['hopeful', 'optimistic', 'confident', 'positive', 'encouraged', 'inspired'],
+            'stress': ['stressed', 'overwhelmed', 'pressure', 'burden', 'strain', 'tension', 'exhausted']
+        }
+        
+        self.theme_keywords = {
+            'relationships': ['friend', 'family', 'partner', 'relationship', 'love', 'conflict', 'connection', 'dating'],
+            'work': ['work', 'job', 'career', 'boss', 'colleague', 'project', 'meeting', 'deadline', 'office'],
+            'growth': ['learn', 'grow', 'develop', 'improve', 'progress', 'change', 'evolve', 'better'],
+            'health': ['health', 'exercise', 'diet', 'sleep', 'tired', 'energy', 'wellness', 'fitness'],
+            'goals': ['goal', 'dream', 'ambition', 'plan', 'future', 'aspiration', 'vision', 'achieve'],
+            'creativity': ['create', 'art', 'music', 'write', 'creative', 'inspiration', 'imagine', 'design'],
+            'spirituality': ['faith', 'spiritual', 'meditation', 'prayer', 'meaning', 'purpose', 'soul'],
+            'nature': ['nature', 'outdoors', 'walk', 'garden', 'trees', 'weather', 'seasons', 'hiking']
+        }
+        
+        self.sentiment_keywords = {
+            'positive': ['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 
+                         'love', 'happy', 'joy', 'success', 'accomplished', 'proud', 'grateful'],
+            'negative': ['bad', 'terrible', 'awful', 'horrible', 'hate', 'sad', 'angry', 
+                         'frustrated', 'disappointed', 'failed', 'worried', 'anxious', 'stressed']
+        }
+        
+        # Compiled once so rule-based analysis scans each entry a single time
+        self.lexicon = Lexicon({
+            'emotion': self.emotion_keywords,
+            'theme': self.theme_keywords,
+            'sentiment': self.sentiment_keywords
+        })
+        
+        # Backend discovery runs in the background; request paths only read its cache
+        self._state_lock = threading.RLock()
+        self._auto_select = True
+        self.health_monitor = BackendHealthMonitor({
+            'lm_studio': self._probe_lm_studio,
+            'ollama': self._probe_ollama,
+            'openai_compatible': self._probe_openai_compatible
+        }, ttl=Config.AI_HEALTH_TTL, on_update=self._apply_health)
+        
+        # Read-only status snapshot, replaced whole whenever configuration or health changes
+        self._status = None
+        self._publish_status()
+        
+        if start_monitor:
+            self.start_health_monitor()
+    
+    def start_health_monitor(self):
+        """Start background backend discovery"""
+        self.health_monitor.start()
         
     def check_available_services(self):
-        """Check all available AI services and set the best one"""
+        """Select the best available AI service from cached health results.
+        
+        Never waits on the network: if no fresh results exist yet, a background
+        probe is requested and the selection is applied when it completes.
+        """
+        with self._state_lock:
+            self._auto_select = True
+            snapshot = self.health_monitor.snapshot()
+            if snapshot:
+                self._select_best_backend(snapshot)
+            self._publish_status()
+        
+        if not self.health_monitor.is_fresh():
+            self.health_monitor.request_refresh()
+    
+    def _select_best_backend(self, snapshot):
+        """Pick LM Studio, then Ollama, then rule-based from health results"""
+        lm_studio = snapshot.get('lm_studio', {})
+        ollama = snapshot.get('ollama', {})
+        # config is replaced, never mutated, so a reader holding the old dict sees consistent settings
+        config = self.config.copy()
+        
         # Try LM Studio first
-        if self.check_lm_studio_connection():
-            self.config['endpoint_type'] = 'lm_studio'
-            self.current_endpoint = self.config['lm_studio_url']
-            logging.info("Using LM Studio for AI analysis")
+        if lm_studio.get('available') and lm_studio.get('models'):
+            config['endpoint_type'] = 'lm_studio'
+            self.current_endpoint = config['lm_studio_url']
+            self.available_models = lm_studio['models']
         # Fall back to Ollama
-        elif self.check_ollama_connection():
-            self.config['endpoint_type'] = 'ollama'
-            self.current_endpoint = self.config['ollama_url']
-            logging.info("Using Ollama for AI analysis")
+        elif ollama.get('available'):
+            config['endpoint_type'] = 'ollama'
+            self.current_endpoint = config['ollama_url']
+            self.available_models = ollama['models']
         else:
-            self.config['endpoint_type'] = 'rule_based'
+            config['endpoint_type'] = 'rule_based'
             self.current_endpoint = None
-            logging.info("Using rule-based analysis")
+            self.available_models = []
+        
+        if config['endpoint_type'] != self.config['endpoint_type']:
+            logging.info(f"Using {config['endpoint_type']} for AI analysis")
+        self.config = config
+    
+    def _apply_health(self, snapshot):
+        """Apply a completed probe round (called from the monitor thread)"""
+        with self._state_lock:
+            if self._auto_select:
+                self._select_best_backend(snapshot)
+            else:
+                # An explicitly chosen backend keeps its place; only its models track health
+                result = snapshot.get(self.config['endpoint_type'])
+                if result is not None:
+                    self.available_models = result['models'] if result['available'] else []
+            self._publish_status()
+    
+    def _client(self, base_url):
+        """Get the pooled HTTP client for a backend URL"""
+        with self._clients_lock:
+            client = self._clients.get(base_url)
+            if client is None:
+                client = BackendClient(
+                    base_url,
+                    pool_size=Config.AI_HTTP_POOL_SIZE,
+                    connect_timeout=Config.AI_CONNECT_TIMEOUT,
+                    read_timeout=Config.AI_READ_TIMEOUT,
+                    max_retries=Config.AI_MAX_RETRIES,
+                    backoff=Config.AI_RETRY_BACKOFF
+                )
+                self._clients[base_url] = client
+            return client
+    
+    def _probe(self, base_url, path):
+        """Quick availability check with the short probe timeout and retry budget"""
+        return self._client(base_url).get(path, read_timeout=Config.AI_PROBE_TIMEOUT, retries=Config.AI_PROBE_RETRIES)
+    
+    def _probe_lm_studio(self, url=None):
+        """Get LM Studio's models, or None if it is unavailable or has none loaded"""
+        response = self._probe(url or self.config['lm_studio_url'], '/models')
+        if response.status_code == 200:
+            models = [model['id'] for model in response.json().get('data', [])]
+            return models or None
+        return None
+    
+    def _probe_ollama(self, url=None):
+        """Get Ollama's models, or None if it is unavailable"""
+        response = self._probe(url or self.config['ollama_url'], '/api/tags')
+        if response.status_code == 200:
+            return [model['name'] for model in response.json().get('models', [])]
+        return None
+    
+    def _probe_openai_compatible(self, url=None):
+        """Get a custom OpenAI-compatible API's models, or None if unset or unavailable"""
+        url = url or self.config['custom_url']
+        if not url:
+            return None
+        response = self._probe(url, '/models')
+        if response.status_code == 200:
+            return [model['id'] for model in response.json().get('data', [])]
+        return None
     
     def check_lm_studio_connection(self):
         """Check if LM Studio is available and get available models"""
-        try:
-            response = requests.get(f"{self.config['lm_studio_url']}/models", timeout=5)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.available_models = [model['id'] for model in models_data.get('data', [])]
-                if self.available_models:
-                    logging.info(f"LM Studio connected. Available models: {self.available_models}")
-                    return True
-        except Exception as e:
-            logging.debug(f"LM Studio not available: {str(e)}")
-        return False
+        return self._check_backend('lm_studio') is not None
         
     def check_ollama_connection(self):
         """Check if Ollama is available and get available models"""
-        try:
-            response = requests.get(f"{self.config['ollama_url']}/api/tags", timeout=5)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.available_models = [model['name'] for model in models_data.get('models', [])]
-                logging.info(f"Ollama connected. Available models: {self.available_models}")
-                return True
-        except Exception as e:
-            logging.debug(f"Ollama not available: {str(e)}")
-        return False
+        return self._check_backend('ollama') is not None
+    
+    def _check_backend(self, endpoint_type, url=None):
+        """Probe a backend now; returns its models, or None if it is unavailable.
+        
+        The probe runs outside the lock. If the backend is still the configured
+        one, its models are swapped in and the status is republished.
+        """
+        models = self.health_monitor.check(endpoint_type, *([url] if url else []))
+        if endpoint_type == 'lm_studio' and not models:
+            models = None  # LM Studio is only usable with a model loaded
+        
+        with self._state_lock:
+            if self.config['endpoint_type'] == endpoint_type and (url is None or url == self.config['custom_url']):
+                self.available_models = models or []
+            self._publish_status()
+        
+        if models is not None:
+            logging.info(f"{endpoint_type} connected. Available models: {models}")
+        return models
     
     def get_status(self):
-        """Get current AI service status"""
-        if self.config['endpoint_type'] == 'lm_studio' and self.available_models:
-            return {
-                'backend': f'LM Studio ({self.available_models[0]})',
-                'available': True,
-                'models': self.available_models,
-                'endpoint': self.current_endpoint
-            }
-        elif self.config['endpoint_type'] == 'ollama' and self.available_models:
-            return {
-                'backend': f'Ollama ({self.available_models[0]})',
-                'available': True,
-                'models': self.available_models,
-                'endpoint': self.current_endpoint
-            }
-        else:
-            return {
-                'backend': 'Rule-based Analysis',
-                'available': True,
-                'models': [],
-                'endpoint': None
-            }
+        """Get the current AI status snapshot (read-only; never probes or waits on a lock)"""
+        return self._status
+    
+    @property
+    def status_version(self):
+        """Increases every time the published status changes"""
+        return self._status['version']
+    
+    def _publish_status(self):
+        """Rebuild the status snapshot and swap it in if anything visible changed"""
+        with self._state_lock:
+            endpoint_type = self.config['endpoint_type']
+            models = tuple(self.available_models)
+            endpoint = self.current_endpoint
+            
+            if endpoint_type == 'lm_studio' and models:
+                status = {
+                    'backend': f'LM Studio ({models[0]})',
+                    'available': True,
+                    'models': models,
+                    'endpoint': endpoint
+                }
+            elif endpoint_type == 'ollama' and models:
+                status = {
+                    'backend': f'Ollama ({models[0]})',
+                    'available': True,
+                    'models': models,
+                    'endpoint': endpoint
+                }
+            else:
+                status = {
+                    'backend': 'Rule-based Analysis',
+                    'available': True,
+                    'models': (),
+                    'endpoint': None
+                }
+            
+            status['detecting'] = not self.health_monitor.ready
+            status['health'] = MappingProxyType({
+                name: MappingProxyType({'available': result['available']})
+                for name, result in self.health_monitor.snapshot().items()
+            })
+            
+            previous = self._status
+            if previous is not None and all(previous[key] == value for key, value in status.items()):
+                return
+            status['version'] = previous['version'] + 1 if previous is not None else 1
+            # A single reference assignment, so readers see the old snapshot or the new one, never a mix
+            self._status = MappingProxyType(status)
     
     def get_available_endpoints(self):
         """Get list of available AI endpoints"""
+        config = self.config
         endpoints = [
             {
                 'type': 'lm_studio',
                 'name': 'LM Studio',
-                'url': self.config['lm_studio_url'],
-                'available': self.config['endpoint_type'] == 'lm_studio'
+                'url': config['lm_studio_url'],
+                'available': config['endpoint_type'] == 'lm_studio'
             },
             {
                 'type': 'ollama',
                 'name': 'Ollama',
-                'url': self.config['ollama_url'],
-                'available': self.config['endpoint_type'] == 'ollama'
+                'url': config['ollama_url'],
+                'available': config['endpoint_type'] == 'ollama'
             },
             {
                 'type': 'rule_based',
@@ -111,6 +291,43 @@ class LocalAIService:
         ]
         return endpoints
     
+    def active_backend(self):
+        """Snapshot of the backend an analysis started now would use.
+        
+        A dict with 'endpoint_type', 'url', 'model' and 'api_key', read together
+        under the lock; endpoint_type is 'rule_based' when no model backend is
+        usable. Analyses use only this snapshot, so a concurrent reconfiguration
+        never mixes one backend's URL with another's model.
+        """
+        with self._state_lock:
+            config = self.config
+            endpoint_type = config['endpoint_type']
+            if not self.available_models or endpoint_type not in BACKEND_URL_KEYS:
+                return {'endpoint_type': 'rule_based', 'url': None, 'model': None, 'api_key': None}
+            if endpoint_type == 'ollama':
+                model = self.available_models[0]
+            else:
+                model = config.get('model_name') or self.available_models[0]
+            return {
+                'endpoint_type': endpoint_type,
+                'url': config[BACKEND_URL_KEYS[endpoint_type]],
+                'model': model,
+                'api_key': config.get('api_key') if endpoint_type == 'openai_compatible' else None
+            }
+    
+    def get_active_model(self):
+        """Get (backend, model) that analyze_entry would use right now"""
+        backend = self.active_backend()
+        return backend['endpoint_type'], backend['model']
+    
+    def apply_configuration(self, settings):
+        """Apply stored settings without probing; background discovery picks up the new URLs"""
+        with self._state_lock:
+            config = self.config.copy()
+            config.update(settings)
+            self.config = config
+            self._publish_status()
+    
     def get_configuration(self):
         """Get current configuration"""
         return self.config.copy()
@@ -118,35 +335,43 @@ class LocalAIService:
     def update_configuration(self, new_config):
         """Update AI service configuration"""
         try:
-            # Update configuration
+            # Probed against a copy outside the lock, so status reads and health updates never wait on the network
+            config = self.config.copy()
             for key, value in new_config.items():
-                if key in self.config:
-                    self.config[key] = value
-            
-            # Reset and recheck services
-            self.available_models = []
-            self.current_endpoint = None
+                if key in config:
+                    config[key] = value
             
+            models = None
+            endpoint = None
             if new_config.get('endpoint_type') == 'lm_studio':
-                success = self.check_lm_studio_connection()
-                if success:
-                    self.config['endpoint_type'] = 'lm_studio'
-                    self.current_endpoint = self.config['lm_studio_url']
+                models = self.health_monitor.check('lm_studio', config['lm_studio_url'])
+                success = bool(models)
+                endpoint = config['lm_studio_url']
             elif new_config.get('endpoint_type') == 'ollama':
-                success = self.check_ollama_connection()
-                if success:
-                    self.config['endpoint_type'] = 'ollama'
-                    self.current_endpoint = self.config['ollama_url']
+                models = self.health_monitor.check('ollama', config['ollama_url'])
+                success = models is not None
+                endpoint = config['ollama_url']
             elif new_config.get('endpoint_type') == 'openai_compatible':
-                success = self.check_openai_compatible_connection(new_config.get('custom_url', ''))
-                if success:
-                    self.config['endpoint_type'] = 'openai_compatible'
-                    self.current_endpoint = new_config.get('custom_url', '')
+                models = self.health_monitor.check('openai_compatible', config['custom_url'])
+                success = models is not None
+                endpoint = config['custom_url']
             else:
                 # Fall back to rule-based
-                self.config['endpoint_type'] = 'rule_based'
+                config['endpoint_type'] = 'rule_based'
                 success = True
             
+            if success and models is not None:
+                logging.info(f"{config['endpoint_type']} connected. Available models: {models}")
+            
+            # Swapped in together so the health monitor and other requests never see a half-applied change
+            with self._state_lock:
+                # An explicit choice stops background auto-selection from overriding it
+                self._auto_select = False
+                self.config = config
+                self.current_endpoint = endpoint if success else None
+                self.available_models = models if success and models else []
+                self._publish_status()
+            
             return success
             
         except Exception as e:
@@ -155,49 +380,30 @@ class LocalAIService:
     
     def check_openai_compatible_connection(self, url):
         """Check OpenAI-compatible API connection"""
-        try:
-            if not url:
-                return False
-            response = requests.get(f"{url}/models", timeout=5)
-            if response.status_code == 200:
-                models_data = response.json()
-                self.available_models = [model['id'] for model in models_data.get('data', [])]
-                logging.info(f"OpenAI-compatible API connected. Available models: {self.available_models}")
-                return True
-        except Exception as e:
-            logging.debug(f"OpenAI-compatible API not available: {str(e)}")
-        return False
+        return self._check_backend('openai_compatible', url) is not None
     
     def test_connection(self):
         """Test current AI connection"""
+        config = self.config
+        labels = {'lm_studio': 'LM Studio', 'ollama': 'Ollama', 'openai_compatible': 'Custom API'}
         try:
-            if self.config['endpoint_type'] == 'lm_studio':
-                success = self.check_lm_studio_connection()
-                return {
-                    'success': success,
-                    'message': f"LM Studio {'connected' if success else 'not available'}",
-                    'models': self.available_models if success else []
-                }
-            elif self.config['endpoint_type'] == 'ollama':
-                success = self.check_ollama_connection()
-                return {
-                    'success': success,
-                    'message': f"Ollama {'connected' if success else 'not available'}",
-                    'models': self.available_models if success else []
-                }
-            elif self.config['endpoint_type'] == 'openai_compatible':
-                success = self.check_openai_compatible_connection(self.config['custom_url'])
-                return {
-                    'success': success,
-                    'message': f"Custom API {'connected' if success else 'not available'}",
-                    'models': self.available_models if success else []
-                }
-            else:
+            endpoint_type = config['endpoint_type']
+            if endpoint_type not in labels:
                 return {
                     'success': True,
                     'message': "Rule-based analysis is always available",
                     'models': []
                 }
+            
+            # The check publishes the refreshed model list along with the status
+            url = config['custom_url'] if endpoint_type == 'openai_compatible' else None
+            models = self._check_backend(endpoint_type, url)
+            success = models is not None
+            return {
+                'success': success,
+                'message': f"{labels[endpoint_type]} {'connected' if success else 'not available'}",
+                'models': models or []
+            }
         except Exception as e:
             return {
                 'success': False,
@@ -205,144 +411,198 @@ class LocalAIService:
                 'models': []
             }
     
-    def analyze_entry(self, entry_text, mode='reflective'):
-        """Analyze journal entry using local AI or rule-based analysis"""
-        # Try current AI service if available
-        if self.available_models:
-            try:
-                if self.config['endpoint_type'] == 'lm_studio':
-                    return self._analyze_with_lm_studio(entry_text, mode)
-                elif self.config['endpoint_type'] == 'ollama':
-                    return self._analyze_with_ollama(entry_text, mode)
-                elif self.config['endpoint_type'] == 'openai_compatible':
-                    return self._analyze_with_openai_compatible(entry_text, mode)
-            except Exception as e:
-                logging.warning(f"AI analysis failed: {str(e)}")
+    def analyze_entry(self, entry_text, mode='reflective', backend=None, tokens=None):
+        """Analyze journal entry using local AI or rule-based analysis.
+        
+        backend is an active_backend() snapshot; one is taken here if the
+        caller has none, and nothing else about the backend is read afterwards.
+        tokens are the entry's stored distinct words (EntryEnricher); when
+        given, rule-based analysis scans them instead of the text.
+        """
+        backend = backend or self.active_backend()
+        try:
+            if backend['endpoint_type'] == 'lm_studio':
+                return self._analyze_with_lm_studio(entry_text, mode, backend)
+            elif backend['endpoint_type'] == 'ollama':
+                return self._analyze_with_ollama(entry_text, mode, backend)
+            elif backend['endpoint_type'] == 'openai_compatible':
+                return self._analyze_with_openai_compatible(entry_text, mode, backend)
+        except Exception as e:
+            logging.warning(f"AI analysis failed: {str(e)}")
         
         # Fallback to rule-based analysis
-        return self._analyze_with_rules(entry_text, mode)
+        return self._analyze_with_rules(entry_text, mode, tokens)
     
-    def _analyze_with_lm_studio(self, entry_text, mode):
+    def _analyze_with_lm_studio(self, entry_text, mode, backend):
         """Use LM Studio for AI analysis"""
-        if not self.available_models:
-            raise Exception("No models available")
-            
-        model = self.config.get('model_name') or self.available_models[0]
-        system_prompt = self._get_system_prompt(mode)
-        
         payload = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Journal Entry:\n{entry_text}"}
-            ],
+            "model": backend['model'],
+            "messages": self._build_messages(entry_text, mode),
             "temperature": 0.7,
             "max_tokens": 800,
             "stream": False
         }
         
-        response = requests.post(f"{self.config['lm_studio_url']}/chat/completions", 
-                               json=payload, timeout=30)
+        response = self._client(backend['url']).post('/chat/completions', json=payload)
         
         if response.status_code == 200:
             result = response.json()
             content = result.get('choices', [{}])[0].get('message', {}).get('content', '{}')
             
-            try:
-                parsed_result = json.loads(content)
-                parsed_result['mode'] = mode
-                return parsed_result
-            except json.JSONDecodeError:
-                # If JSON parsing fails, create structured response from text
-                return self._parse_unstructured_response(content, mode)
+            return self._parse_response_content(content, mode)
         
         raise Exception(f"LM Studio request failed: {response.status_code}")
     
-    def _analyze_with_openai_compatible(self, entry_text, mode):
+    def _analyze_with_openai_compatible(self, entry_text, mode, backend):
         """Use OpenAI-compatible API for analysis"""
-        if not self.available_models:
-            raise Exception("No models available")
-            
-        model = self.config.get('model_name') or self.available_models[0]
-        system_prompt = self._get_system_prompt(mode)
-        
         headers = {}
-        if self.config.get('api_key'):
-            headers['Authorization'] = f"Bearer {self.config['api_key']}"
+        if backend['api_key']:
+            headers['Authorization'] = f"Bearer {backend['api_key']}"
         
         payload = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Journal Entry:\n{entry_text}"}
-            ],
+            "model": backend['model'],
+            "messages": self._build_messages(entry_text, mode),
             "temperature": 0.7,
             "max_tokens": 800,
             "stream": False
         }
         
-        response = requests.post(f"{self.config['custom_url']}/chat/completions", 
-                               json=payload, headers=headers, timeout=30)
+        response = self._client(backend['url']).post('/chat/completions', json=payload, headers=headers)
         
         if response.status_code == 200:
             result = response.json()
             content = result.get('choices', [{}])[0].get('message', {}).get('content', '{}')
             
-            try:
-                parsed_result = json.loads(content)
-                parsed_result['mode'] = mode
-                return parsed_result
-            except json.JSONDecodeError:
-                return self._parse_unstructured_response(content, mode)
+            return self._parse_response_content(content, mode)
         
         raise Exception(f"API request failed: {response.status_code}")
     
-    def _analyze_with_ollama(self, entry_text, mode):
+    def _analyze_with_ollama(self, entry_text, mode, backend):
         """Use Ollama for AI analysis"""
-        model = self.available_models[0]  # Use first available model
-        
-        system_prompt = self._get_system_prompt(mode)
-        
         payload = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Journal Entry:\n{entry_text}"}
-            ],
+            "model": backend['model'],
+            "messages": self._build_messages(entry_text, mode),
             "stream": False,
             "format": "json"
         }
         
-        response = requests.post(f"{self.config['ollama_url']}/api/chat", json=payload, timeout=30)
+        response = self._client(backend['url']).post('/api/chat', json=payload)
         
         if response.status_code == 200:
             result = response.json()
             content = result.get('message', {}).get('content', '{}')
             
-            try:
-                parsed_result = json.loads(content)
-                parsed_result['mode'] = mode
-                return parsed_result
-            except json.JSONDecodeError:
-                # If JSON parsing fails, create structured response from text
-                return self._parse_unstructured_response(content, mode)
+            return self._parse_response_content(content, mode)
         
         raise Exception(f"Ollama request failed: {response.status_code}")
     
-    def _analyze_with_rules(self, entry_text, mode):
+    def stream_analysis(self, entry_text, mode='reflective', backend=None, tokens=None):
+        """Analyze an entry while streaming progress events.
+        
+        Yields dicts: {'type': 'token', 'content'} for each model delta,
+        {'type': 'field', 'name', 'value'} as each JSON field completes, and
+        finally {'type': 'result', 'analysis'}. backend and tokens are as for
+        analyze_entry.
+        """
+        backend = backend or self.active_backend()
+        try:
+            if backend['endpoint_type'] in ('lm_studio', 'openai_compatible'):
+                chunks = self._stream_openai_style(backend, entry_text, mode)
+            elif backend['endpoint_type'] == 'ollama':
+                chunks = self._stream_ollama(backend, entry_text, mode)
+            else:
+                chunks = None
+            
+            if chunks is not None:
+                yield from self._relay_stream(chunks, mode)
+                return
+        except Exception as e:
+            logging.warning(f"Streaming AI analysis failed: {str(e)}")
+        
+        # Fallback to rule-based analysis
+        yield {'type': 'result', 'analysis': self._analyze_with_rules(entry_text, mode, tokens)}
+    
+    def _relay_stream(self, chunks, mode):
+        """Turn raw content deltas into token, field and result events"""
+        parser = IncrementalJSONParser()
+        
+        for chunk in chunks:
+            yield {'type': 'token', 'content': chunk}
+            for name, value in parser.feed(chunk):
+                yield {'type': 'field', 'name': name, 'value': value}
+        
+        yield {'type': 'result', 'analysis': self._parse_response_content(parser.buffer, mode)}
+    
+    def _stream_ollama(self, backend, entry_text, mode):
+        """Yield content deltas from Ollama's streaming /api/chat"""
+        payload = {
+            "model": backend['model'],
+            "messages": self._build_messages(entry_text, mode),
+            "stream": True,
+            "format": "json"
+        }
+        
+        with self._client(backend['url']).post('/api/chat', json=payload, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"Ollama request failed: {response.status_code}")
+            
+            # Newline-delimited JSON, one message fragment per line
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                data = json.loads(line)
+                content = data.get('message', {}).get('content', '')
+                if content:
+                    yield content
+                if data.get('done'):
+                    break
+    
+    def _stream_openai_style(self, backend, entry_text, mode):
+        """Yield content deltas from an OpenAI-style streaming /chat/completions"""
+        headers = {}
+        if backend['api_key']:
+            headers['Authorization'] = f"Bearer {backend['api_key']}"
+        
+        payload = {
+            "model": backend['model'],
+            "messages": self._build_messages(entry_text, mode),
+            "temperature": 0.7,
+            "max_tokens": 800,
+            "stream": True
+        }
+        
+        with self._client(backend['url']).post('/chat/completions', json=payload, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                raise Exception(f"API request failed: {response.status_code}")
+            
+            # Server-sent events: "data: {...}" lines terminated by "data: [DONE]"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                choices = json.loads(data).get('choices') or [{}]
+                content = choices[0].get('delta', {}).get('content')
+                if content:
+                    yield content
+    
+    def _analyze_with_rules(self, entry_text, mode, tokens=None):
         """Rule-based analysis when AI is not available"""
-        word_count = len(entry_text.split())
+        # Emotion, theme and sentiment keywords in a single pass; this lexicon is wider than the
+        # pattern analyzer's, so it reads the stored words rather than the stored keyword counts
+        keyword_counts = self.lexicon.scan_tokens(tokens) if tokens is not None else self.lexicon.scan(entry_text)
         
         # Emotion detection
-        emotions = self._detect_emotions(entry_text)
+        emotions = keyword_counts['emotion']
         dominant_emotion = max(emotions.items(), key=lambda x: x[1])[0] if emotions else 'neutral'
         
         # Theme detection
-        themes = self._detect_themes(entry_text)
+        themes = keyword_counts['theme']
         dominant_theme = max(themes.items(), key=lambda x: x[1])[0] if themes else 'reflection'
         
         # Sentiment analysis
-        sentiment = self._calculate_sentiment(entry_text)
+        sentiment = self._sentiment_from_counts(keyword_counts['sentiment'])
         
         # Generate insights based on mode
         insight = self._generate_insight(entry_text, mode, dominant_emotion, dominant_theme, sentiment)
@@ -361,60 +621,20 @@ class LocalAIService:
     
     def _detect_emotions(self, text):
         """Detect emotions using keyword matching"""
-        emotion_keywords = {
-            'joy': ['happy', 'joy', 'excited', 'elated', 'cheerful', 'delighted', 'thrilled', 'glad', 'content'],
-            'sadness': ['sad', 'depressed', 'down', 'melancholy', 'blue', 'gloomy', 'sorrowful', 'upset', 'disappointed'],
-            'anger': ['angry', 'mad', 'furious', 'irritated', 'annoyed', 'frustrated', 'livid', 'outraged'],
-            'fear': ['afraid', 'scared', 'anxious', 'worried', 'nervous', 'fearful', 'terrified', 'concerned'],
-            'love': ['love', 'affection', 'adore', 'cherish', 'devoted', 'fond', 'caring', 'tender'],
-            'gratitude': ['grateful', 'thankful', 'blessed', 'appreciative', 'indebted'],
-            'hope': ['hopeful', 'optimistic', 'confident', 'positive', 'encouraged', 'inspired'],
-            'stress': ['stressed', 'overwhelmed', 'pressure', 'burden', 'strain', 'tension', 'exhausted']
-        }
-        
-        text_lower = text.lower()
-        emotions = {}
-        
-        for emotion, keywords in emotion_keywords.items():
-            count = sum(1 for keyword in keywords if keyword in text_lower)
-            if count > 0:
-                emotions[emotion] = count
-                
-        return emotions
+        return self.lexicon.scan(text)['emotion']
     
     def _detect_themes(self, text):
         """Detect themes using keyword matching"""
-        theme_keywords = {
-            'relationships': ['friend', 'family', 'partner', 'relationship', 'love', 'conflict', 'connection', 'dating'],
-            'work': ['work', 'job', 'career', 'boss', 'colleague', 'project', 'meeting', 'deadline', 'office'],
-            'growth': ['learn', 'grow', 'develop', 'improve', 'progress', 'change', 'evolve', 'better'],
-            'health': ['health', 'exercise', 'diet', 'sleep', 'tired', 'energy', 'wellness', 'fitness'],
-            'goals': ['goal', 'dream', 'ambition', 'plan', 'future', 'aspiration', 'vision', 'achieve'],
-            'creativity': ['create', 'art', 'music', 'write', 'creative', 'inspiration', 'imagine', 'design'],
-            'spirituality': ['faith', 'spiritual', 'meditation', 'prayer', 'meaning', 'purpose', 'soul'],
-            'nature': ['nature', 'outdoors', 'walk', 'garden', 'trees', 'weather', 'seasons', 'hiking']
-        }
-        
-        text_lower = text.lower()
-        themes = {}
-        
-        for theme, keywords in theme_keywords.items():
-            count = sum(1 for keyword in keywords if keyword in text_lower)
-            if count > 0:
-                themes[theme] = count
-                
-        return themes
+        return self.lexicon.scan(text)['theme']
     
     def _calculate_sentiment(self, text):
         """Calculate simple sentiment score"""
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 
-                         'love', 'happy', 'joy', 'success', 'accomplished', 'proud', 'grateful']
-        negative_words = ['bad', 'terrible', 'awful', 'horrible', 'hate', 'sad', 'angry', 
-                         'frustrated', 'disappointed', 'failed', 'worried', 'anxious', 'stressed']
-        
-        text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        return self._sentiment_from_counts(self.lexicon.scan(text)['sentiment'])
+    
+    def _sentiment_from_counts(self, sentiment_counts):
+        """Classify positive/negative keyword counts as a sentiment label"""
+        positive_count = sentiment_counts.get('positive', 0)
+        negative_count = sentiment_counts.get('negative', 0)
         
         if positive_count > negative_count:
             return 'positive'
@@ -593,6 +813,25 @@ class LocalAIService:
             Be warm, understanding, and encouraging.
             """
     
+    def _build_messages(self, entry_text, mode):
+        """Build the chat messages sent to every backend"""
+        return [
+            {"role": "system", "content": self._get_system_prompt(mode)},
+            {"role": "user", "content": f"Journal Entry:\n{entry_text}"}
+        ]
+    
+    def _parse_response_content(self, content, mode):
+        """Parse a completed model response, falling back to unstructured text"""
+        try:
+            parsed_result = json.loads(content)
+            if not isinstance(parsed_result, dict):
+                raise json.JSONDecodeError("Expected a JSON object", content, 0)
+            parsed_result['mode'] = mode
+            return parsed_result
+        except json.JSONDecodeError:
+            # If JSON parsing fails, create structured response from text
+            return self._parse_unstructured_response(content, mode)
+    
     def _parse_unstructured_response(self, content, mode):
         """Parse unstructured AI response into expected format"""
         return {
@@ -617,4 +856,28 @@ class LocalAIService:
         return {
             'rating': rating_map.get(sentiment, 3),
             'confidence': 0.75  # Rule-based confidence
-        }
\ No newline at end of file
+        }
+
+
+class IncrementalJSONParser:
+    """Extract completed string fields from a JSON object as it streams in"""
+    FIELD_PATTERN = re.compile(r'"(\w+)"\s*:\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+    
+    def __init__(self):
+        self.buffer = ''
+        self._position = 0
+    
+    def feed(self, chunk):
+        """Append a chunk and return (name, value) for fields completed by it"""
+        self.buffer += chunk
+        fields = []
+        
+        for match in self.FIELD_PATTERN.finditer(self.buffer, self._position):
+            try:
+                value = json.loads(f'"{match.group(2)}"')
+            except json.JSONDecodeError:
+                value = match.group(2)
+            fields.append((match.group(1), value))
+            self._position = match.end()
+        
+        return fields
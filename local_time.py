@@ -0,0 +1,36 @@
+"""
+Journal timezone handling
+
+Timestamps are stored as naive UTC. The day an entry belongs to, and the
+times shown to the user, are in the journal's configured timezone.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from config import Config
+
+@lru_cache(maxsize=None)
+def get_timezone():
+    """The configured journal timezone, or None to follow the server's local time"""
+    return ZoneInfo(Config.JOURNAL_TIMEZONE) if Config.JOURNAL_TIMEZONE else None
+
+def to_local(timestamp):
+    """Convert a naive UTC timestamp to naive local time"""
+    aware = timestamp.replace(tzinfo=timezone.utc)
+    tz = get_timezone()
+    return (aware.astimezone(tz) if tz else aware.astimezone()).replace(tzinfo=None)
+
+def local_date(timestamp):
+    """The journal day a naive UTC timestamp falls on"""
+    return to_local(timestamp).date()
+
+def local_today():
+    """Today's date in the journal timezone"""
+    return local_date(datetime.utcnow())
+
+def to_utc(timestamp):
+    """Convert a timestamp to naive UTC for storage; naive input is taken as journal-local time"""
+    if timestamp.tzinfo is None:
+        tz = get_timezone()
+        timestamp = timestamp.replace(tzinfo=tz) if tz else timestamp.astimezone()
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
@@ -1,4 +1,7 @@
-from app import app
+from app import app, analysis_queue
+
+# Only the serving process runs analysis workers
+analysis_queue.start()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,222 @@
+"""
+Lightweight schema migrations for SelfScope
+
+db.create_all() only creates missing tables, so columns added to existing
+models are applied here with ALTER TABLE. Column DDL sticks to types both
+SQLite and Postgres accept, or is compiled from a column type per database.
+"""
+import logging
+from sqlalchemy import inspect, text, update
+from sqlalchemy.dialects.postgresql import JSONB
+from models import db, JournalEntry, AnalyticsData, JSONText
+from local_time import local_date
+
+# (table, column, column DDL or a type compiled for the database) added after a table was first released
+COLUMN_MIGRATIONS = [
+    ('analytics_data', 'entry_count', 'INTEGER DEFAULT 0'),
+    ('analytics_data', 'word_count', 'INTEGER DEFAULT 0'),
+    ('analytics_data', 'updated_at', 'TIMESTAMP'),
+    ('journal_entries', 'entry_date', 'DATE'),
+    ('journal_entries', 'analysis_version', 'INTEGER'),
+    ('journal_entries', 'tokens', JSONText()),
+    ('journal_entries', 'keyword_counts', JSONText()),
+    ('journal_entries', 'sentiment_score', 'FLOAT'),
+    ('journal_entries', 'reading_seconds', 'INTEGER'),
+    ('journal_entries', 'text_profile', JSONText()),
+    ('journal_entries', 'enrichment_version', 'INTEGER'),
+    ('journal_state', 'facets_version', 'INTEGER'),
+]
+
+# (index name, table, columns) for indexes on migrated columns
+INDEX_MIGRATIONS = [
+    ('ix_journal_entries_entry_date', 'journal_entries', 'entry_date'),
+    ('ix_journal_entries_enrichment_version', 'journal_entries', 'enrichment_version'),
+]
+
+# External-content FTS5 index over journal entries, kept in sync by triggers
+SQLITE_SEARCH_INDEX = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS journal_entries_fts USING fts5(
+        title, text, content='journal_entries', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS journal_entries_fts_insert AFTER INSERT ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journal_entries_fts_delete AFTER DELETE ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(journal_entries_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journal_entries_fts_update AFTER UPDATE OF title, text ON journal_entries BEGIN
+        INSERT INTO journal_entries_fts(journal_entries_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO journal_entries_fts(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END""",
+]
+
+# Weighted tsvector over journal entries; searches must use this exact
+# expression for Postgres to answer them from the GIN index
+POSTGRES_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', text), 'B')"
+)
+
+POSTGRES_SEARCH_INDEX = (
+    f"CREATE INDEX IF NOT EXISTS ix_journal_entries_search ON journal_entries USING gin (({POSTGRES_SEARCH_DOCUMENT}))"
+)
+
+# (index name, table, column) GIN indexes over the AI and analytics JSONB payloads; jsonb_path_ops
+# keeps them small and serves containment (@>) lookups such as entries with a given emotion
+POSTGRES_JSON_INDEXES = [
+    ('ix_journal_entries_ai_response', 'journal_entries', 'ai_response'),
+    ('ix_analytics_data_emotion_data', 'analytics_data', 'emotion_data'),
+    ('ix_analytics_data_theme_data', 'analytics_data', 'theme_data'),
+]
+
+def run_migrations():
+    """Apply column migrations, backfill derived columns and create the search indexes"""
+    applied = migrate_columns()
+    migrate_indexes()
+    if db.engine.dialect.name == 'postgresql':
+        # Before any session reads: ALTER COLUMN waits on every open transaction on the table
+        migrate_json_columns()
+    backfill_entry_dates()
+    if db.engine.dialect.name == 'sqlite':
+        create_sqlite_search_index()
+    elif db.engine.dialect.name == 'postgresql':
+        create_postgres_search_index()
+        create_postgres_json_indexes()
+    return applied
+
+def migrate_json_columns():
+    """Convert Postgres JSON columns created as TEXT to JSONB"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    converted = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        column_types = {col['name']: col['type'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            current = column_types.get(column.name)
+            if not isinstance(column.type, JSONText) or current is None or isinstance(current, JSONB):
+                continue
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(text(
+                        f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                        f"TYPE jsonb USING NULLIF({column.name}, '')::jsonb"
+                    ))
+                converted.append(f"{table.name}.{column.name}")
+            except Exception as e:
+                # The column keeps working as TEXT; JSONText passes its strings through
+                logging.error(f"Could not convert {table.name}.{column.name} to jsonb: {str(e)}")
+
+    if converted:
+        logging.info(f"Converted JSON columns to jsonb: {', '.join(converted)}")
+    return converted
+
+def create_postgres_search_index():
+    """Create the GIN expression index behind tsvector search"""
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(text(POSTGRES_SEARCH_INDEX))
+        return True
+
+    except Exception as e:
+        logging.warning(f"Full-text search index unavailable: {str(e)}")
+        return False
+
+def create_postgres_json_indexes():
+    """Create GIN indexes on the JSONB payload columns"""
+    inspector = inspect(db.engine)
+    created = []
+
+    for name, table, column in POSTGRES_JSON_INDEXES:
+        column_types = {col['name']: col['type'] for col in inspector.get_columns(table)}
+        if not isinstance(column_types.get(column), JSONB):
+            # Left as TEXT by a failed conversion, which GIN cannot index
+            logging.warning(f"Skipping GIN index on {table}.{column}: column is not jsonb")
+            continue
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} jsonb_path_ops)"
+                ))
+            created.append(name)
+        except Exception as e:
+            logging.warning(f"Could not create GIN index {name}: {str(e)}")
+    return created
+
+def create_sqlite_search_index():
+    """Create the FTS5 search index and its triggers, backfilling on first creation"""
+    try:
+        with db.engine.begin() as connection:
+            exists = connection.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'journal_entries_fts'"
+            )).first() is not None
+
+            for statement in SQLITE_SEARCH_INDEX:
+                connection.execute(text(statement))
+
+            if not exists:
+                connection.execute(text("INSERT INTO journal_entries_fts(journal_entries_fts) VALUES ('rebuild')"))
+                logging.info("Created full-text search index")
+        return True
+
+    except Exception as e:
+        # SQLite builds without FTS5 fall back to LIKE search
+        logging.warning(f"Full-text search index unavailable: {str(e)}")
+        return False
+
+def migrate_columns():
+    """Add any missing columns to existing tables"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    applied = []
+
+    with db.engine.begin() as connection:
+        for table, column, ddl in COLUMN_MIGRATIONS:
+            if table not in existing_tables:
+                continue
+
+            columns = {col['name'] for col in inspector.get_columns(table)}
+            if column in columns:
+                continue
+
+            if not isinstance(ddl, str):
+                ddl = ddl.compile(dialect=db.engine.dialect)
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            applied.append(f"{table}.{column}")
+
+    if applied:
+        logging.info(f"Applied schema migrations: {', '.join(applied)}")
+    return applied
+
+def migrate_indexes():
+    """Create indexes for migrated columns (create_all only indexes new tables)"""
+    with db.engine.begin() as connection:
+        for name, table, columns in INDEX_MIGRATIONS:
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+def backfill_entry_dates(batch_size=1000):
+    """Fill entry_date for entries written before it existed"""
+    total = 0
+    while True:
+        rows = db.session.query(JournalEntry.id, JournalEntry.timestamp, JournalEntry.updated_at).filter(
+            JournalEntry.entry_date.is_(None)
+        ).limit(batch_size).all()
+        if not rows:
+            db.session.commit()  # end the read transaction so it holds no locks
+            break
+        
+        db.session.execute(update(JournalEntry), [
+            # updated_at is passed through so the column's onupdate does not touch it
+            {'id': row.id, 'entry_date': local_date(row.timestamp), 'updated_at': row.updated_at} for row in rows
+        ])
+        db.session.commit()
+        total += len(rows)
+    
+    if total:
+        # Existing rollups were keyed by UTC day; clear them so ensure_analytics rebuilds by local day
+        AnalyticsData.query.delete(synchronize_session=False)
+        db.session.commit()
+        logging.info(f"Backfilled entry dates for {total} entries")
+    return total
@@ -3,21 +3,55 @@ Database models for SelfScope
 """
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
 import json
+from local_time import to_local
 
 db = SQLAlchemy()
 
+class JSONText(TypeDecorator):
+    """JSON document held as a string by the application: Text on SQLite, JSONB on Postgres"""
+    impl = db.Text
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(db.Text())
+    
+    def process_bind_param(self, value, dialect):
+        # JSONB serializes the value itself, so decode the string the models built
+        if dialect.name == 'postgresql' and isinstance(value, str):
+            return json.loads(value)
+        return value
+    
+    def process_result_value(self, value, dialect):
+        # A column still typed TEXT (created before JSONB) already returns the JSON string
+        if dialect.name == 'postgresql' and value is not None and not isinstance(value, str):
+            return json.dumps(value)
+        return value
+
 class JournalEntry(db.Model):
     """Journal entry model"""
     __tablename__ = 'journal_entries'
     
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    entry_date = db.Column(db.Date, index=True)  # Local calendar day of timestamp, in the journal timezone
     text = db.Column(db.Text, nullable=False)
     word_count = db.Column(db.Integer, default=0)
-    ai_response = db.Column(db.Text)  # JSON string
+    ai_response = db.Column(JSONText)  # JSON string
     insight_mode = db.Column(db.String(50), default='reflective')
+    analysis_version = db.Column(db.Integer)  # PROMPT_VERSION that produced ai_response
     title = db.Column(db.String(200))  # Optional title for the entry
+    # Derived from text by EntryEnricher when the text is written
+    tokens = db.Column(JSONText)  # Distinct lower-cased words; the rule-based analyzer scans these, not the text
+    keyword_counts = db.Column(JSONText)  # Lexicon hits per group and category
+    sentiment_score = db.Column(db.Float)  # Rule-based, -1 to 1
+    reading_seconds = db.Column(db.Integer)
+    text_profile = db.Column(JSONText)  # Length class, sentence and vocabulary statistics, language hint
+    enrichment_version = db.Column(db.Integer, index=True)  # ENRICHMENT_VERSION that produced the fields above
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -26,25 +60,35 @@ class JournalEntry(db.Model):
     
     @property
     def date_str(self):
-        """Get date as string"""
-        return self.timestamp.strftime('%Y-%m-%d')
+        """Get local date as string"""
+        return to_local(self.timestamp).strftime('%Y-%m-%d')
     
     @property
     def time_str(self):
-        """Get time as string"""
-        return self.timestamp.strftime('%H:%M')
+        """Get local time as string"""
+        return to_local(self.timestamp).strftime('%H:%M')
     
     @property
     def datetime_str(self):
-        """Get datetime as formatted string"""
-        return self.timestamp.strftime('%Y-%m-%d %H:%M')
+        """Get local datetime as formatted string"""
+        return to_local(self.timestamp).strftime('%Y-%m-%d %H:%M')
+    
+    @property
+    def token_list(self):
+        """Stored distinct words, or None for entries not yet enriched"""
+        return json.loads(self.tokens) if self.tokens else None
     
     @property
     def ai_response_dict(self):
         """Get AI response as dictionary"""
-        if self.ai_response:
+        return self.parse_ai_response(self.ai_response)
+    
+    @staticmethod
+    def parse_ai_response(raw):
+        """Decode a stored AI response JSON string"""
+        if raw:
             try:
-                return json.loads(self.ai_response)
+                return json.loads(raw)
             except json.JSONDecodeError:
                 return {}
         return {}
@@ -57,6 +101,117 @@ class JournalEntry(db.Model):
         else:
             self.ai_response = None
 
+class EntryInsight(db.Model):
+    """Structured analysis of one journal entry, derived from its text and AI response"""
+    __tablename__ = 'entry_insights'
+    
+    entry_id = db.Column(db.Integer, db.ForeignKey('journal_entries.id', ondelete='CASCADE'), primary_key=True)
+    entry_date = db.Column(db.Date, index=True)  # Copy of the entry's local day so aggregates need no join
+    emotion = db.Column(db.String(50), index=True)  # Dominant detected emotion; None when no keyword matched
+    theme = db.Column(db.String(50), index=True)  # Dominant detected theme
+    sentiment_score = db.Column(db.Float)  # -1 to 1
+    archetype = db.Column(db.String(200), index=True)  # From the AI response, when it named one
+    insight_mode = db.Column(db.String(50), index=True)
+    analysis_version = db.Column(db.Integer)
+    
+    def __repr__(self):
+        return f'<EntryInsight entry={self.entry_id} {self.emotion}/{self.theme}>'
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'emotion': self.emotion,
+            'theme': self.theme,
+            'sentiment': self.sentiment_score or 0,
+            'archetype': self.archetype,
+            'insight_mode': self.insight_mode
+        }
+
+class EntryFacet(db.Model):
+    """One (facet, value) tag of a journal entry, e.g. ('emotion', 'stress'), for faceted filtering"""
+    __tablename__ = 'entry_facets'
+    __table_args__ = (
+        # Covers "entries tagged value in a date range" without touching the table
+        db.Index('ix_entry_facets_lookup', 'facet', 'value', 'entry_date', 'entry_id'),
+    )
+    
+    entry_id = db.Column(db.Integer, db.ForeignKey('journal_entries.id', ondelete='CASCADE'), primary_key=True)
+    facet = db.Column(db.String(20), primary_key=True)  # emotion, theme or archetype
+    value = db.Column(db.String(200), primary_key=True)
+    entry_date = db.Column(db.Date, index=True)
+    
+    def __repr__(self):
+        return f'<EntryFacet entry={self.entry_id} {self.facet}={self.value}>'
+
+class JournalState(db.Model):
+    """Journal-wide change version, advanced by every write to entries or rollups"""
+    __tablename__ = 'journal_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    change_version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    facets_version = db.Column(db.Integer)  # FACETS_VERSION the facet index was last built under
+    
+    def __repr__(self):
+        return f'<JournalState v{self.change_version}>'
+
+class AnalysisJob(db.Model):
+    """Queued AI analysis for a journal entry"""
+    __tablename__ = 'analysis_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('journal_entries.id', ondelete='CASCADE'), nullable=False, index=True)
+    insight_mode = db.Column(db.String(50), nullable=False, default='reflective')
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # pending, running, done, failed
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<AnalysisJob {self.id} entry={self.entry_id} {self.status}>'
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'entry_id': self.entry_id,
+            'insight_mode': self.insight_mode,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class AnalysisCacheEntry(db.Model):
+    """Cached AI analysis keyed by a hash of its inputs"""
+    __tablename__ = 'analysis_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), nullable=False, unique=True, index=True)  # sha256 hex
+    insight_mode = db.Column(db.String(50))
+    backend = db.Column(db.String(50))
+    model_name = db.Column(db.String(255))
+    prompt_version = db.Column(db.Integer)
+    response = db.Column(db.Text, nullable=False)  # JSON string
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<AnalysisCacheEntry {self.cache_key[:12]}>'
+    
+    @property
+    def response_dict(self):
+        """Get cached response as dictionary"""
+        try:
+            return json.loads(self.response)
+        except (TypeError, json.JSONDecodeError):
+            return {}
+
 class AIConfiguration(db.Model):
     """AI configuration settings"""
     __tablename__ = 'ai_configurations'
@@ -93,11 +248,14 @@ class AnalyticsData(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, index=True)
-    emotion_data = db.Column(db.Text)  # JSON string
-    theme_data = db.Column(db.Text)   # JSON string
+    emotion_data = db.Column(JSONText)  # JSON string
+    theme_data = db.Column(JSONText)   # JSON string
     sentiment_score = db.Column(db.Float)
     writing_streak = db.Column(db.Integer, default=1)
+    entry_count = db.Column(db.Integer, default=0)
+    word_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<AnalyticsData {self.date}>'
@@ -136,4 +294,16 @@ class AnalyticsData(db.Model):
         if value:
             self.theme_data = json.dumps(value)
         else:
-            self.theme_data = None
\ No newline at end of file
+            self.theme_data = None
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'date': self.date.strftime('%Y-%m-%d'),
+            'emotions': self.emotions,
+            'themes': self.themes,
+            'sentiment': self.sentiment_score or 0,
+            'writing_streak': self.writing_streak or 0,
+            'entry_count': self.entry_count or 0,
+            'word_count': self.word_count or 0
+        }
@@ -0,0 +1,46 @@
+"""
+In-process cache of rendered pages keyed on the journal change version
+"""
+import threading
+from collections import OrderedDict
+
+class PageCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get rendered HTML, or None on a miss"""
+        with self._lock:
+            html = self._pages.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def put(self, key, html):
+        """Store rendered HTML, dropping the least recently used page when full"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._pages[key] = html
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def get_or_render(self, key, render):
+        """Cached HTML for key, rendering and storing it on a miss"""
+        html = self.get(key)
+        if html is None:
+            html = render()
+            self.put(key, html)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
@@ -2,6 +2,10 @@ import re
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 import logging
+from lexicon import Lexicon
+
+# Time buckets the analytics series can be grouped into; weeks start on Monday
+ANALYTICS_BUCKETS = ('day', 'week', 'month')
 
 class PatternAnalyzer:
     def __init__(self):
@@ -26,180 +30,399 @@ class PatternAnalyzer:
             'spirituality': ['faith', 'spiritual', 'meditation', 'prayer', 'meaning', 'purpose'],
             'nature': ['nature', 'outdoors', 'walk', 'garden', 'trees', 'weather', 'seasons']
         }
+        
+        self.sentiment_keywords = {
+            'positive': ['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 
+                         'love', 'happy', 'joy', 'success', 'accomplished', 'proud'],
+            'negative': ['bad', 'terrible', 'awful', 'horrible', 'hate', 'sad', 'angry', 
+                         'frustrated', 'disappointed', 'failed', 'worried', 'anxious']
+        }
+        
+        # All keyword sets compiled together so one scan yields every category count
+        self.lexicon = Lexicon({
+            'emotion': self.emotion_keywords,
+            'theme': self.theme_keywords,
+            'sentiment': self.sentiment_keywords
+        })
     
-    def analyze_patterns(self, entries):
-        """Analyze patterns across journal entries"""
-        try:
-            if not entries:
-                return {
-                    'total_entries': 0,
-                    'total_words': 0,
-                    'avg_words_per_entry': 0,
-                    'most_common_emotions': [],
-                    'most_common_themes': [],
-                    'writing_frequency': {}
-                }
-            
-            total_words = sum(entry.get('word_count', 0) for entry in entries)
-            avg_words = total_words / len(entries) if entries else 0
+    def analyze_all(self, entries):
+        """Patterns, sentiment trends and theme analysis in a single pass.
+        
+        entries may be any iterable, including a generator; each entry's text
+        is scanned at most once (not at all when it carries the keyword counts
+        and sentiment stored at write time) and feeds every accumulator. Returns
+        {'patterns', 'sentiment_trends', 'theme_analysis'} in the formats of
+        analyze_patterns, get_sentiment_trends and get_theme_analysis.
+        """
+        total_entries = 0
+        total_words = 0
+        emotion_counts = Counter()
+        theme_counts = Counter()
+        weekday_counts = Counter()
+        days = set()
+        parsed_dates = {}
+        sentiment_data = []
+        theme_evolution = defaultdict(list)
+        
+        for entry in entries:
+            date = entry.get('date', '')
+            word_count = entry.get('word_count', 0)
+            counts, sentiment = self._scan_entry(entry)
             
-            # Analyze emotions and themes
-            emotion_counts = self._analyze_emotions(entries)
-            theme_counts = self._analyze_themes(entries)
+            total_entries += 1
+            total_words += word_count
+            emotion_counts.update(counts.get('emotion', {}))
+            theme_counts.update(counts.get('theme', {}))
             
-            # Analyze writing frequency
-            frequency_analysis = self._analyze_writing_frequency(entries)
+            sentiment_data.append({
+                'date': date,
+                'sentiment': sentiment,
+                'word_count': word_count
+            })
+            for theme, count in counts.get('theme', {}).items():
+                theme_evolution[theme].append({'date': date, 'count': count})
             
-            return {
-                'total_entries': len(entries),
+            if date:
+                # Many entries share a day, so each date string is parsed once
+                if date not in parsed_dates:
+                    try:
+                        parsed_dates[date] = datetime.strptime(date, '%Y-%m-%d')
+                    except ValueError:
+                        parsed_dates[date] = None
+                day = parsed_dates[date]
+                if day:
+                    weekday_counts[day.strftime('%A')] += 1
+                    days.add(day)
+        
+        if total_entries:
+            patterns = {
+                'total_entries': total_entries,
                 'total_words': total_words,
-                'avg_words_per_entry': round(avg_words, 1),
+                'avg_words_per_entry': round(total_words / total_entries, 1),
                 'most_common_emotions': emotion_counts.most_common(5),
                 'most_common_themes': theme_counts.most_common(5),
-                'writing_frequency': frequency_analysis
+                'writing_frequency': self._writing_frequency(weekday_counts, days)
             }
-            
+        else:
+            patterns = self._empty_patterns()
+        
+        # Sorts are stable, so entries on the same date keep their input order
+        sentiment_data.sort(key=lambda x: x['date'])
+        for data_points in theme_evolution.values():
+            data_points.sort(key=lambda x: x['date'])
+        
+        return {
+            'patterns': patterns,
+            'sentiment_trends': sentiment_data,
+            'theme_analysis': dict(theme_evolution)
+        }
+    
+    def analyze_patterns(self, entries):
+        """Analyze patterns across journal entries"""
+        try:
+            return self.analyze_all(entries)['patterns']
         except Exception as e:
             logging.error(f"Error analyzing patterns: {str(e)}")
             return {}
     
-    def get_sentiment_trends(self, entries):
-        """Get sentiment trends over time"""
+    def get_sentiment_trends(self, entries, bucket=None):
+        """Get sentiment trends over time, one point per entry or, given a bucket, per day/week/month"""
         try:
-            sentiment_data = []
-            
-            for entry in entries:
-                # Simple sentiment analysis based on keywords
-                text = entry.get('text', '').lower()
-                sentiment_score = self._calculate_sentiment_score(text)
-                
-                sentiment_data.append({
-                    'date': entry.get('date', ''),
-                    'sentiment': sentiment_score,
-                    'word_count': entry.get('word_count', 0)
-                })
-            
-            # Sort by date
-            sentiment_data.sort(key=lambda x: x['date'])
-            
-            return sentiment_data
-            
+            trends = self.analyze_all(entries)['sentiment_trends']
+            return self.downsample_sentiment_trends(trends, bucket) if bucket else trends
         except Exception as e:
             logging.error(f"Error getting sentiment trends: {str(e)}")
             return []
     
-    def get_theme_analysis(self, entries):
-        """Get detailed theme analysis"""
+    def get_theme_analysis(self, entries, bucket=None):
+        """Get detailed theme analysis, one point per entry or, given a bucket, per day/week/month"""
         try:
-            theme_evolution = defaultdict(list)
-            
-            for entry in entries:
-                text = entry.get('text', '').lower()
-                date = entry.get('date', '')
-                
-                # Count themes in this entry
-                for theme, keywords in self.theme_keywords.items():
-                    count = sum(1 for keyword in keywords if keyword in text)
-                    if count > 0:
-                        theme_evolution[theme].append({
-                            'date': date,
-                            'count': count
-                        })
-            
-            # Convert to format suitable for charting
-            theme_data = {}
-            for theme, data_points in theme_evolution.items():
-                # Sort by date
-                data_points.sort(key=lambda x: x['date'])
-                theme_data[theme] = data_points
-            
-            return theme_data
-            
+            theme_analysis = self.analyze_all(entries)['theme_analysis']
+            return self.downsample_theme_analysis(theme_analysis, bucket) if bucket else theme_analysis
         except Exception as e:
             logging.error(f"Error getting theme analysis: {str(e)}")
             return {}
     
-    def _analyze_emotions(self, entries):
-        """Analyze emotional content across entries"""
-        emotion_counts = Counter()
+    def score_tokens(self, tokens, word_count):
+        """Keyword counts per group and sentiment score of an entry from its distinct lower-cased words"""
+        counts = self.lexicon.scan_tokens(tokens)
+        return {
+            'keyword_counts': counts,
+            'sentiment': self._sentiment_from_counts(counts['sentiment'], word_count)
+        }
+    
+    def _scan_entry(self, entry):
+        """(scan() counts, sentiment) of an entry; the stored 'keyword_counts' and 'sentiment_score' when present"""
+        counts = entry.get('keyword_counts')
+        if counts is not None:
+            return counts, entry.get('sentiment_score') or 0
+        text = entry.get('text', '')
+        counts = self.lexicon.scan(text)
+        return counts, self._sentiment_from_counts(counts['sentiment'], len(text.split()))
+    
+    def dominant(self, keyword_counts, group):
+        """Most frequent category of a group in scan() counts, or None; ties go to the first defined"""
+        counts = keyword_counts.get(group) or {}
+        categories = [category for category in self.lexicon.groups[group] if category in counts]
+        return max(categories, key=counts.get) if categories else None
+    
+    def summarize_entries(self, entries):
+        """Summarize a group of entries (typically one day) for storage as a rollup.
         
+        Entries carrying the 'keyword_counts' and 'sentiment_score' stored at
+        write time are not rescanned; others are scanned from 'text'.
+        """
+        emotion_counts = Counter()
+        theme_counts = Counter()
+        scores = []
+
         for entry in entries:
-            text = entry.get('text', '').lower()
-            for emotion, keywords in self.emotion_keywords.items():
-                count = sum(1 for keyword in keywords if keyword in text)
-                if count > 0:
-                    emotion_counts[emotion] += count
+            counts, sentiment = self._scan_entry(entry)
+            scores.append(sentiment)
+            emotion_counts.update(counts.get('emotion', {}))
+            theme_counts.update(counts.get('theme', {}))
+
+        sentiment = sum(scores) / len(scores) if scores else 0
+
+        return {
+            'emotions': dict(emotion_counts),
+            'themes': dict(theme_counts),
+            'sentiment': sentiment,
+            'entry_count': len(entries),
+            'word_count': sum(entry.get('word_count', 0) for entry in entries)
+        }
+
+    def analyze_daily_all(self, daily):
+        """Patterns, sentiment trends and theme analysis from per-day rollups in a single pass.
         
-        return emotion_counts
-    
-    def _analyze_themes(self, entries):
-        """Analyze thematic content across entries"""
+        daily comes from DatabaseJournalService.get_daily_analytics; the result
+        has the same shape as analyze_all.
+        """
+        total_entries = 0
+        total_words = 0
+        max_streak = 0
+        emotion_counts = Counter()
         theme_counts = Counter()
+        weekday_counts = Counter()
+        sentiment_data = []
+        theme_data = defaultdict(list)
         
-        for entry in entries:
-            text = entry.get('text', '').lower()
-            for theme, keywords in self.theme_keywords.items():
-                count = sum(1 for keyword in keywords if keyword in text)
-                if count > 0:
-                    theme_counts[theme] += count
+        days = sorted(daily, key=lambda x: x['date'])
+        for day in days:
+            total_entries += day['entry_count']
+            total_words += day['word_count']
+            max_streak = max(max_streak, day['writing_streak'] or 0)
+            emotion_counts.update(day['emotions'])
+            theme_counts.update(day['themes'])
+            weekday = datetime.strptime(day['date'], '%Y-%m-%d').strftime('%A')
+            weekday_counts[weekday] += day['entry_count']
+            
+            sentiment_data.append({
+                'date': day['date'],
+                'sentiment': day['sentiment'],
+                'word_count': day['word_count']
+            })
+            for theme, count in day['themes'].items():
+                theme_data[theme].append({'date': day['date'], 'count': count})
         
-        return theme_counts
+        if total_entries:
+            patterns = {
+                'total_entries': total_entries,
+                'total_words': total_words,
+                'avg_words_per_entry': round(total_words / total_entries, 1),
+                'most_common_emotions': emotion_counts.most_common(5),
+                'most_common_themes': theme_counts.most_common(5),
+                'writing_frequency': {
+                    'by_weekday': dict(weekday_counts),
+                    'max_streak': max_streak,
+                    'total_days': len(days)
+                }
+            }
+        else:
+            patterns = self._empty_patterns()
+        
+        return {
+            'patterns': patterns,
+            'sentiment_trends': sentiment_data,
+            'theme_analysis': dict(theme_data)
+        }
     
-    def _analyze_writing_frequency(self, entries):
-        """Analyze writing frequency patterns"""
+    def analyze_daily_patterns(self, daily):
+        """Analyze patterns from per-day rollups"""
         try:
-            dates = [entry.get('date', '') for entry in entries if entry.get('date')]
-            if not dates:
-                return {}
-            
-            # Convert to datetime objects
-            date_objects = []
-            for date_str in dates:
+            return self.analyze_daily_all(daily)['patterns']
+        except Exception as e:
+            logging.error(f"Error analyzing daily patterns: {str(e)}")
+            return {}
+    
+    @staticmethod
+    def bucket_start(day, bucket):
+        """First day of the bucket containing day"""
+        if bucket == 'week':
+            return day - timedelta(days=day.weekday())
+        if bucket == 'month':
+            return day.replace(day=1)
+        return day
+    
+    @classmethod
+    def choose_bucket(cls, start, end, max_points):
+        """Finest bucket that spans start..end (dates, inclusive) in at most max_points points"""
+        for bucket in ANALYTICS_BUCKETS:
+            first, last = cls.bucket_start(start, bucket), cls.bucket_start(end, bucket)
+            if bucket == 'month':
+                points = (last.year - first.year) * 12 + last.month - first.month + 1
+            else:
+                points = (last - first).days // (7 if bucket == 'week' else 1) + 1
+            if points <= max_points:
+                return bucket
+        return ANALYTICS_BUCKETS[-1]
+    
+    def bucket_daily(self, daily, bucket='day'):
+        """Merge per-day rollups into day, week or month buckets, oldest first.
+        
+        Each bucket has its first day as 'date', summed entry_count,
+        word_count, emotions and themes, the mean sentiment over its entries
+        (each day's sentiment weighted by its entry count) and the lowest and
+        highest daily sentiment.
+        """
+        return self._bucket_points(daily, bucket)
+    
+    def _bucket_points(self, points, bucket):
+        """Aggregate dated points (rollup days or single entries) into buckets"""
+        if bucket not in ANALYTICS_BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}'")
+        
+        buckets = {}
+        parsed_dates = {}
+        for point in points:
+            date = point.get('date', '')
+            if date not in parsed_dates:
                 try:
-                    date_objects.append(datetime.strptime(date_str, '%Y-%m-%d'))
+                    parsed_dates[date] = self.bucket_start(datetime.strptime(date, '%Y-%m-%d').date(), bucket)
                 except ValueError:
-                    continue
-            
-            if not date_objects:
-                return {}
-            
-            # Analyze by day of week
-            weekday_counts = Counter(date.strftime('%A') for date in date_objects)
-            
-            # Analyze streaks
-            date_objects.sort()
-            current_streak = 1
-            max_streak = 1
+                    parsed_dates[date] = None
+            start = parsed_dates[date]
+            if start is None:
+                continue
             
-            for i in range(1, len(date_objects)):
-                if (date_objects[i] - date_objects[i-1]).days == 1:
-                    current_streak += 1
-                    max_streak = max(max_streak, current_streak)
-                else:
-                    current_streak = 1
-            
-            return {
-                'by_weekday': dict(weekday_counts),
-                'max_streak': max_streak,
-                'total_days': len(set(date_objects))
-            }
-            
-        except Exception as e:
-            logging.error(f"Error analyzing writing frequency: {str(e)}")
-            return {}
+            current = buckets.get(start)
+            if current is None:
+                current = buckets[start] = {
+                    'date': start.strftime('%Y-%m-%d'),
+                    'entry_count': 0,
+                    'word_count': 0,
+                    'sentiment': 0,
+                    'sentiment_min': None,
+                    'sentiment_max': None,
+                    'emotions': Counter(),
+                    'themes': Counter()
+                }
+            entry_count = point.get('entry_count', 1)
+            sentiment = point.get('sentiment') or 0
+            current['entry_count'] += entry_count
+            current['word_count'] += point.get('word_count', 0) or 0
+            current['sentiment'] += sentiment * entry_count
+            if current['sentiment_min'] is None or sentiment < current['sentiment_min']:
+                current['sentiment_min'] = sentiment
+            if current['sentiment_max'] is None or sentiment > current['sentiment_max']:
+                current['sentiment_max'] = sentiment
+            current['emotions'].update(point.get('emotions', {}))
+            current['themes'].update(point.get('themes', {}))
+        
+        for current in buckets.values():
+            if current['entry_count']:
+                current['sentiment'] /= current['entry_count']
+        return [buckets[start] for start in sorted(buckets)]
     
-    def _calculate_sentiment_score(self, text):
-        """Calculate a simple sentiment score"""
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 
-                         'love', 'happy', 'joy', 'success', 'accomplished', 'proud']
-        negative_words = ['bad', 'terrible', 'awful', 'horrible', 'hate', 'sad', 'angry', 
-                         'frustrated', 'disappointed', 'failed', 'worried', 'anxious']
+    @staticmethod
+    def _sentiment_points(buckets):
+        return [{
+            'date': current['date'],
+            'sentiment': current['sentiment'],
+            'sentiment_min': current['sentiment_min'],
+            'sentiment_max': current['sentiment_max'],
+            'entry_count': current['entry_count'],
+            'word_count': current['word_count']
+        } for current in buckets]
+    
+    def get_sentiment_series(self, daily, bucket='day'):
+        """Mean, lowest and highest daily sentiment, entry count and word count per bucket"""
+        return self._sentiment_points(self.bucket_daily(daily, bucket))
+    
+    def downsample_sentiment_trends(self, trends, bucket):
+        """Collapse get_sentiment_trends output (one point per entry) into one point per bucket"""
+        return self._sentiment_points(self._bucket_points(trends, bucket))
+    
+    def downsample_theme_analysis(self, theme_analysis, bucket):
+        """Collapse get_theme_analysis output (one point per entry per theme) into bucket totals"""
+        return {theme: [{'date': current['date'], 'count': current['entry_count']}
+                        for current in self._bucket_points(
+                            ({'date': point['date'], 'entry_count': point['count']} for point in points), bucket)]
+                for theme, points in theme_analysis.items()}
+    
+    def get_theme_series(self, daily, bucket='day'):
+        """Theme totals, most common first, and each theme's count per bucket where it appears"""
+        totals = Counter()
+        series = defaultdict(list)
+        for current in self.bucket_daily(daily, bucket):
+            totals.update(current['themes'])
+            for theme, count in current['themes'].items():
+                series[theme].append({'date': current['date'], 'count': count})
+        return {'totals': totals.most_common(), 'series': dict(series)}
+    
+    def get_frequency_series(self, daily, bucket='day'):
+        """Weekday histogram, streak and day count, plus entries and words per bucket"""
+        frequency = self.analyze_daily_all(daily)['patterns']['writing_frequency']
+        return {
+            'by_weekday': frequency.get('by_weekday', {}),
+            'max_streak': frequency.get('max_streak', 0),
+            'total_days': frequency.get('total_days', 0),
+            'points': [{
+                'date': current['date'],
+                'entry_count': current['entry_count'],
+                'word_count': current['word_count']
+            } for current in self.bucket_daily(daily, bucket)]
+        }
+    
+    def _writing_frequency(self, weekday_counts, days):
+        """Weekday histogram, longest run of consecutive days and day count"""
+        if not days:
+            return {}
+        
+        distinct_days = sorted(days)
+        current_streak = 1
+        max_streak = 1
         
-        positive_count = sum(1 for word in positive_words if word in text)
-        negative_count = sum(1 for word in negative_words if word in text)
+        for i in range(1, len(distinct_days)):
+            if (distinct_days[i] - distinct_days[i-1]).days == 1:
+                current_streak += 1
+                max_streak = max(max_streak, current_streak)
+            else:
+                current_streak = 1
+        
+        return {
+            'by_weekday': dict(weekday_counts),
+            'max_streak': max_streak,
+            'total_days': len(distinct_days)
+        }
+    
+    @staticmethod
+    def _empty_patterns():
+        return {
+            'total_entries': 0,
+            'total_words': 0,
+            'avg_words_per_entry': 0,
+            'most_common_emotions': [],
+            'most_common_themes': [],
+            'writing_frequency': {}
+        }
+    
+    def _sentiment_from_counts(self, sentiment_counts, total_words):
+        """Turn positive/negative keyword counts into a -1 to 1 score"""
+        positive_count = sentiment_counts.get('positive', 0)
+        negative_count = sentiment_counts.get('negative', 0)
         
         # Normalize to -1 to 1 scale
-        total_words = len(text.split())
         if total_words == 0:
             return 0
         
@@ -260,8 +260,8 @@ document.addEventListener('DOMContentLoaded', function() {
                     <div class="spinner-border text-primary mb-3" role="status">
                         <span class="visually-hidden">Loading...</span>
                     </div>
-                    <h5>Analyzing your entry...</h5>
-                    <p class="text-muted mb-0">Our AI is reading and reflecting on your thoughts</p>
+                    <h5>Saving your entry...</h5>
+                    <p class="text-muted mb-0">AI insights will follow in the background</p>
                 </div>
             </div>
         `;
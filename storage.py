@@ -0,0 +1,80 @@
+"""
+Database engine tuning for SQLite and Postgres
+
+SQLite's stock settings use a rollback journal, so every commit locks out
+readers and concurrent writers fail fast with "database is locked". The
+'wal' profile switches to write-ahead logging, where readers never wait on
+the writer, and gives writers a busy timeout to queue behind each other.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import SingletonThreadPool
+from config import Config
+
+STORAGE_PROFILES = ('wal', 'default')
+
+def database_uri(database_url):
+    """SQLAlchemy URI for DATABASE_URL, accepting the postgres:// scheme hosting providers hand out"""
+    if database_url.startswith('postgres://'):
+        # SQLAlchemy only knows postgresql://; the driver stays SQLAlchemy's default or the one named in the URL
+        return 'postgresql://' + database_url[len('postgres://'):]
+    return database_url
+
+def is_memory_database(url):
+    """Whether a SQLite URL (string or URL object) names an in-memory database"""
+    url = make_url(url)
+    database = url.database or ''
+    return (database in ('', ':memory:') or database.startswith('file::memory:')
+            or url.query.get('mode') == 'memory')
+
+def sqlite_pragmas(profile=None):
+    """(pragma, value) pairs applied to each new SQLite connection under a profile"""
+    if (profile or Config.STORAGE_PROFILE) != 'wal':
+        return []
+    return [
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),  # WAL stays consistent after a crash; only the last commits can be lost on power failure
+        ('busy_timeout', Config.SQLITE_BUSY_TIMEOUT),
+        ('cache_size', -Config.SQLITE_CACHE_SIZE_KB),  # negative values are KiB rather than pages
+        ('mmap_size', Config.SQLITE_MMAP_SIZE),
+        ('temp_store', 'MEMORY'),
+    ]
+
+def engine_options(database_url, profile=None):
+    """SQLALCHEMY_ENGINE_OPTIONS suited to the database behind database_url"""
+    if database_url.startswith('sqlite'):
+        if is_memory_database(database_url):
+            # Named explicitly: SQLAlchemy is dropping its guess from mode=memory. The pool takes no sizing arguments
+            options = {'poolclass': SingletonThreadPool}
+        else:
+            # One writer at a time, so a small pool is plenty
+            options = {'pool_size': 5, 'max_overflow': 5}
+        if (profile or Config.STORAGE_PROFILE) == 'wal':
+            # pysqlite's busy wait, in seconds
+            options['connect_args'] = {'timeout': Config.SQLITE_BUSY_TIMEOUT / 1000}
+        return options
+
+    return {
+        'pool_size': Config.DB_POOL_SIZE,
+        'max_overflow': Config.DB_MAX_OVERFLOW,
+        'pool_pre_ping': True,  # drop connections the server closed while idle
+        'pool_recycle': Config.DB_POOL_RECYCLE
+    }
+
+def configure_engine(engine, profile=None):
+    """Apply the storage profile's PRAGMAs to every new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(profile)
+    if is_memory_database(engine.url):
+        # In-memory databases cannot use WAL; the remaining settings still apply
+        pragmas = [(name, value) for name, value in pragmas if name != 'journal_mode']
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
@@ -0,0 +1,38 @@
+"""
+Shared fixtures: the application against a scratch SQLite database
+"""
+import os
+import shutil
+import tempfile
+import pytest
+
+# app.py reads its configuration when first imported, so point it at a scratch database before any test module loads
+DATABASE_DIR = tempfile.mkdtemp(prefix='selfscope-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DATABASE_DIR, 'selfscope.db')}"
+
+@pytest.fixture(scope='session')
+def app_module():
+    """The app module, imported once; its analysis workers are never started"""
+    import app as app_module
+    yield app_module
+    with app_module.app.app_context():
+        from models import db
+        db.engine.dispose()
+    shutil.rmtree(DATABASE_DIR, ignore_errors=True)
+
+@pytest.fixture
+def journal(app_module):
+    """The journal service inside an app context, over an empty journal"""
+    from models import db, JournalState, AIConfiguration
+    with app_module.app.app_context():
+        # The change version row stays, so versions (and the page cache keyed on them) never repeat
+        for table in reversed(db.metadata.sorted_tables):
+            if table.name not in (JournalState.__tablename__, AIConfiguration.__tablename__):
+                db.session.execute(table.delete())
+        db.session.commit()
+        yield app_module.journal_service
+        db.session.remove()
+
+@pytest.fixture
+def client(app_module, journal):
+    return app_module.app.test_client()
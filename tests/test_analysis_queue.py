@@ -0,0 +1,59 @@
+import threading
+from models import db, AnalysisJob
+
+def test_importing_app_starts_no_workers(app_module):
+    assert app_module.analysis_queue._workers == []
+
+def test_concurrent_workers_never_claim_the_same_job(app_module, journal):
+    queue = app_module.analysis_queue
+    entry = journal.save_entry('Claim race entry')
+    job_ids = {queue.enqueue(entry['id'])['id'] for _ in range(40)}
+
+    claims = []
+    errors = []
+    start = threading.Barrier(6)
+
+    def claimer():
+        start.wait()
+        with app_module.app.app_context():
+            try:
+                while True:
+                    job = queue._claim_next_job()
+                    if job is None:
+                        break
+                    claims.append(job.id)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=claimer) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(claims) == sorted(job_ids)  # every job claimed exactly once
+    jobs = AnalysisJob.query.filter(AnalysisJob.id.in_(job_ids)).all()
+    assert {(job.status, job.attempts) for job in jobs} == {('running', 1)}
+
+def test_processed_job_stores_the_analysis(app_module, journal):
+    queue = app_module.analysis_queue
+    entry = journal.save_entry('I feel happy and grateful about work and my friend')
+    queue.enqueue(entry['id'])
+
+    assert queue._process_next_job()
+    assert not queue._process_next_job()  # queue drained
+
+    assert queue.get_entry_status(entry['id'])['status'] == 'done'
+    assert journal.get_entry(entry['id'])['ai_response']
+
+def test_stale_running_jobs_are_requeued(app_module, journal):
+    queue = app_module.analysis_queue
+    entry = journal.save_entry('Interrupted analysis')
+    queue.enqueue(entry['id'])
+    job = queue._claim_next_job()
+    job.started_at = job.started_at.replace(year=job.started_at.year - 1)
+    db.session.commit()
+
+    assert queue.requeue_stale_jobs() == 1
+    assert queue.get_job(job.id)['status'] == 'pending'
@@ -0,0 +1,59 @@
+import json
+from models import AnalysisJob
+
+ANALYSIS = {'archetype': 'The Sage', 'mode': 'reflective', 'local_analysis': True}
+
+def fake_stream(fail=False):
+    def stream_analysis(entry_text, mode='reflective', tokens=None):
+        yield {'type': 'token', 'text': 'Thinking'}
+        yield {'type': 'token', 'text': ' about it'}
+        if fail:
+            raise RuntimeError('backend went away')
+        yield {'type': 'result', 'analysis': ANALYSIS}
+    return stream_analysis
+
+def events(body):
+    return [json.loads(chunk.split('data: ', 1)[1]) for chunk in body.decode('utf-8').split('\n\n') if chunk]
+
+def test_completed_stream_stores_the_analysis(app_module, client, journal, monkeypatch):
+    monkeypatch.setattr(app_module.ai_service, 'stream_analysis', fake_stream())
+    entry = journal.save_entry('Streamed entry')
+
+    response = client.get(f"/analysis_stream/{entry['id']}")
+
+    assert response.mimetype == 'text/event-stream'
+    assert [event['type'] for event in events(response.data)] == ['token', 'token', 'result']
+    assert journal.get_entry(entry['id'])['ai_response'] == ANALYSIS
+    assert AnalysisJob.query.count() == 0
+
+def test_disconnected_stream_is_finished_in_the_background(app_module, client, journal, monkeypatch):
+    monkeypatch.setattr(app_module.ai_service, 'stream_analysis', fake_stream())
+    entry = journal.save_entry('Reader closed the tab')
+
+    response = client.get(f"/analysis_stream/{entry['id']}", buffered=False)
+    next(response.iter_encoded())
+    response.close()
+
+    job = app_module.analysis_queue.get_entry_status(entry['id'])
+    assert job['status'] == 'pending' and job['insight_mode'] == 'reflective'
+    assert not journal.get_entry(entry['id'])['ai_response']
+
+def test_failed_stream_reports_and_requeues(app_module, client, journal, monkeypatch):
+    monkeypatch.setattr(app_module.ai_service, 'stream_analysis', fake_stream(fail=True))
+    entry = journal.save_entry('Backend failed mid-stream')
+
+    response = client.get(f"/analysis_stream/{entry['id']}?mode=psychological")
+
+    assert events(response.data)[-1] == {'type': 'error', 'message': 'backend went away'}
+    job = app_module.analysis_queue.get_entry_status(entry['id'])
+    assert job['status'] == 'pending' and job['insight_mode'] == 'psychological'
+
+def test_reload_after_stream_does_not_stream_again(client, journal):
+    entry_id = journal.save_entry('Analyzed on the first load')['id']
+    url = f"/?stream_entry={entry_id}&mode=reflective"
+    live = f'id="liveResponse" data-entry-id="{entry_id}"'
+    assert live in client.get(url).get_data(as_text=True)
+
+    journal.update_entry(entry_id, {'ai_response': ANALYSIS})
+
+    assert live not in client.get(url).get_data(as_text=True)
@@ -0,0 +1,42 @@
+import pytest
+
+PAGES = ['/', '/dashboard', '/api/analytics/sentiment']
+
+@pytest.mark.parametrize('url', PAGES)
+def test_matching_etag_gets_304_without_a_body(client, journal, url):
+    journal.save_entry('Something to show')
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers['ETag']
+    assert 'no-cache' in first.headers['Cache-Control']
+
+    again = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+def test_journal_writes_change_the_etag(client, journal):
+    etag = client.get('/').headers['ETag']
+
+    journal.save_entry('A new entry')
+
+    fresh = client.get('/', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200 and fresh.headers['ETag'] != etag
+    assert b'A new entry' in fresh.data
+
+def test_if_modified_since_alone_never_gets_304(client, journal):
+    first = client.get('/')
+    assert 'Last-Modified' not in first.headers
+
+    again = client.get('/', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+    assert again.status_code == 200
+
+def test_pages_differ_by_query_string(client, journal):
+    assert client.get('/dashboard').headers['ETag'] != client.get('/dashboard?range=7').headers['ETag']
+
+def test_flash_messages_bypass_the_cache(client, journal):
+    etag = client.get('/').headers['ETag']
+
+    client.post('/submit_entry', data={'entry_text': 'Flashed', 'insight_mode': 'none'})
+    page = client.get('/', headers={'If-None-Match': etag})
+
+    assert page.status_code == 200 and b'has been saved' in page.data
+    assert 'ETag' not in page.headers
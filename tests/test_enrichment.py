@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+from sqlalchemy import insert, update
+from models import db, JournalEntry, AnalyticsData
+from entry_enricher import ENRICHMENT_VERSION
+
+TEXT = 'Happy and grateful after a long walk, though work left me stressed'
+
+def insert_unenriched(text, timestamp):
+    """An entry as written before the derived columns existed"""
+    db.session.execute(insert(JournalEntry), [{
+        'timestamp': timestamp, 'entry_date': timestamp.date(), 'text': text, 'word_count': len(text.split()),
+        'created_at': timestamp, 'updated_at': timestamp
+    }])
+    db.session.commit()
+    return JournalEntry.query.filter_by(text=text).one()
+
+def test_backfill_derives_fields_once(journal):
+    written = datetime(2024, 3, 1, 12)
+    entry = insert_unenriched(TEXT, written)
+
+    assert journal.ensure_enrichment() == 1
+    assert journal.ensure_enrichment() == 0
+
+    db.session.refresh(entry)
+    assert entry.enrichment_version == ENRICHMENT_VERSION
+    assert 'grateful' in entry.token_list and entry.token_list == sorted(set(entry.token_list))
+    assert json.loads(entry.keyword_counts)['emotion'] == {'joy': 1, 'gratitude': 1, 'stress': 1}
+    assert entry.sentiment_score is not None and entry.reading_seconds > 0
+    assert entry.updated_at == written  # backfilling is not an edit
+
+def test_outdated_entries_are_restated_with_their_rollups(journal):
+    saved = journal.save_entry(TEXT, timestamp=datetime(2024, 3, 1, 12))
+    # An entry enriched by an older version, whose stale counts fed the day's rollup
+    db.session.execute(update(JournalEntry).where(JournalEntry.id == saved['id']).values(
+        enrichment_version=ENRICHMENT_VERSION - 1, tokens=None, keyword_counts=json.dumps({'emotion': {'fear': 1}})
+    ))
+    journal.rebuild_analytics()
+    assert AnalyticsData.query.one().emotions == {'fear': 1}
+
+    assert journal.ensure_enrichment() == 1
+
+    assert journal.get_entry(saved['id'])['tokens']
+    assert AnalyticsData.query.one().emotions == {'joy': 1, 'gratitude': 1, 'stress': 1}
+
+def test_rule_based_analysis_reads_stored_tokens(app_module, journal, monkeypatch):
+    local_ai = app_module.ai_service.local_ai
+    tokens = journal.get_entry(journal.save_entry(TEXT)['id'])['tokens']
+
+    from_text = local_ai._analyze_with_rules(TEXT, 'reflective')
+    def rescan(text):
+        raise AssertionError('entry text scanned again')
+    monkeypatch.setattr(local_ai.lexicon, 'scan', rescan)
+
+    assert local_ai._analyze_with_rules(TEXT, 'reflective', tokens) == from_text
+
+def test_queued_analysis_passes_stored_tokens(app_module, journal, monkeypatch):
+    entry = journal.save_entry('Tokens for the queue: hopeful about a new project')
+    received = []
+    def analyze_entry(entry_text, mode='reflective', backend=None, tokens=None):
+        received.append(tokens)
+        return {'mode': mode}
+    monkeypatch.setattr(app_module.ai_service, 'analyze_entry', analyze_entry)
+
+    app_module.analysis_queue.enqueue(entry['id'])
+    assert app_module.analysis_queue._process_next_job()
+
+    assert received == [journal.get_entry(entry['id'])['tokens']]
+    assert 'hopeful' in received[0]
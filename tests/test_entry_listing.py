@@ -0,0 +1,67 @@
+import pytest
+from datetime import datetime, timedelta
+
+START = datetime(2024, 3, 1, 8)
+
+def save_entries(journal, count):
+    # Pairs share a timestamp, so pages must break ties on id
+    return [journal.save_entry(f'Entry {i}', timestamp=START + timedelta(hours=i // 2))['id'] for i in range(count)]
+
+def all_pages(journal, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = journal.list_entries(limit=limit, cursor=cursor)
+        ids += [entry['id'] for entry in page['entries']]
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids, pages
+
+def test_cursor_pages_cover_every_entry_once_newest_first(journal):
+    saved = save_entries(journal, 25)
+
+    ids, pages = all_pages(journal, limit=7)
+
+    assert pages == 4
+    newest_first = sorted(((i // 2, entry_id) for i, entry_id in enumerate(saved)), reverse=True)
+    assert ids == [entry_id for _, entry_id in newest_first]
+
+def test_exact_last_page_has_no_next_cursor(journal):
+    save_entries(journal, 6)
+    page = journal.list_entries(limit=3)
+    assert page['next_cursor']
+    assert journal.list_entries(limit=3, cursor=page['next_cursor'])['next_cursor'] is None
+
+def test_new_entries_do_not_shift_later_pages(journal):
+    saved = save_entries(journal, 10)
+    first = journal.list_entries(limit=5)
+
+    journal.save_entry('Written while paging', timestamp=START + timedelta(days=1))
+    second = journal.list_entries(limit=5, cursor=first['next_cursor'])
+
+    seen = [entry['id'] for entry in first['entries'] + second['entries']]
+    assert sorted(seen) == sorted(saved)
+
+def test_summary_view_truncates_previews(journal):
+    journal.save_entry('word ' * 200)
+    entry = journal.list_entries(limit=1)['entries'][0]
+    assert entry['truncated'] and 'text' not in entry
+
+    full = journal.list_entries(limit=1, view='full')['entries'][0]
+    assert full['text'] == 'word ' * 200
+
+def test_invalid_cursor_and_view_are_rejected(journal, client):
+    with pytest.raises(ValueError):
+        journal.list_entries(cursor='not-a-cursor')
+    with pytest.raises(ValueError):
+        journal.list_entries(view='everything')
+
+    assert client.get('/api/entries?cursor=not-a-cursor').status_code == 400
+
+def test_api_pages_follow_next_cursor(journal, client):
+    saved = save_entries(journal, 5)
+    first = client.get('/api/entries?limit=3').get_json()
+    second = client.get(f"/api/entries?limit=3&cursor={first['next_cursor']}").get_json()
+
+    ids = [entry['id'] for entry in first['entries'] + second['entries']]
+    assert sorted(ids) == sorted(saved) and second['next_cursor'] is None
@@ -0,0 +1,53 @@
+import pytest
+from datetime import date, datetime
+
+def save(journal, text, day=1):
+    return journal.save_entry(text, timestamp=datetime(2024, 3, day, 12))['id']
+
+@pytest.fixture
+def entries(journal):
+    return {
+        'happy_work': save(journal, 'Happy with how work went', day=1),
+        'happy_family': save(journal, 'Happy evening with family', day=2),
+        'stressed_work': save(journal, 'Stressed about work', day=3),
+        'mixed': save(journal, 'Stressed at work but happy anyway', day=4),
+    }
+
+def listed(journal, **filters):
+    return {entry['id'] for entry in journal.list_entries(limit=100, **filters)['entries']}
+
+def test_values_of_different_facets_intersect(journal, entries):
+    facets = {'emotion': ['joy'], 'theme': ['work']}
+
+    counts = journal.get_facet_counts(facets)
+
+    assert counts['total'] == 2
+    assert counts['facets']['emotion'] == [['joy', 2], ['stress', 1]]
+    assert counts['facets']['theme'] == [['work', 2]]
+    assert listed(journal, facets=facets) == {entries['happy_work'], entries['mixed']}
+
+def test_values_of_one_facet_must_all_match(journal, entries):
+    facets = {'emotion': ['joy', 'stress']}
+    assert journal.get_facet_counts(facets)['total'] == 1
+    assert listed(journal, facets=facets) == {entries['mixed']}
+
+def test_date_range_narrows_entries_and_counts(journal, entries):
+    counts = journal.get_facet_counts({'theme': ['work']}, start_date=date(2024, 3, 2), end_date=date(2024, 3, 3))
+    assert counts['total'] == 1 and counts['facets']['emotion'] == [['stress', 1]]
+
+    unfiltered = journal.get_facet_counts(start_date=date(2024, 3, 2))
+    assert unfiltered['total'] == 3 and ['joy', 2] in unfiltered['facets']['emotion']
+
+def test_facets_follow_edits_and_analysis(journal, entries):
+    journal.update_entry(entries['happy_work'], {'text': 'Sad about work'})
+    journal.update_entry(entries['happy_family'], {'ai_response': {'archetype': 'The Sage - seeking understanding'}})
+
+    assert listed(journal, facets={'emotion': ['joy'], 'theme': ['work']}) == {entries['mixed']}
+    assert listed(journal, facets={'archetype': ['The Sage']}) == {entries['happy_family']}
+
+def test_api_filters_and_rejects_bad_ones(journal, client, entries):
+    with pytest.raises(ValueError):
+        journal.get_facet_counts({'mood': ['joy']})
+
+    assert client.get('/api/entries?emotion=joy&theme=work').get_json()['total'] == 2
+    assert client.get('/api/entries?from=2024-13-01').status_code == 400
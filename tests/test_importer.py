@@ -0,0 +1,61 @@
+import json
+from models import JournalEntry
+from journal_importer import JournalImporter
+
+RECORDS = [
+    {'timestamp': '2024-03-01T08:30:00Z', 'text': 'First morning pages', 'title': 'Day one'},
+    {'timestamp': '2024-03-02T08:30:00Z', 'text': 'Second morning pages',
+     'ai_response': {'archetype': 'The Sage'}, 'analysis_version': 1},
+    {'date': '2024-03-03', 'text': 'Dated only'},
+]
+
+def write_jsonl(path, records, extra_lines=()):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+        for line in extra_lines:
+            f.write(line + '\n')
+    return str(path)
+
+def test_reimport_skips_existing_entries(journal, tmp_path):
+    archive = write_jsonl(tmp_path / 'journal.jsonl', RECORDS)
+    importer = JournalImporter(journal, batch_size=2)
+
+    first = importer.import_path(archive)
+    assert (first['read'], first['imported'], first['skipped'], first['invalid']) == (3, 3, 0, 0)
+
+    second = importer.import_path(archive)
+    assert (second['imported'], second['skipped']) == (0, 3)
+    assert JournalEntry.query.count() == 3
+
+def test_duplicates_within_one_batch_are_imported_once(journal, tmp_path):
+    archive = write_jsonl(tmp_path / 'journal.jsonl', RECORDS + RECORDS[:1])
+
+    stats = JournalImporter(journal).import_path(archive)
+
+    assert (stats['imported'], stats['skipped']) == (3, 1)
+
+def test_same_text_at_another_time_is_not_a_duplicate(journal, tmp_path):
+    repeated = dict(RECORDS[0], timestamp='2024-03-05T08:30:00Z')
+    write_jsonl(tmp_path / 'a.jsonl', RECORDS)
+    JournalImporter(journal).import_path(str(tmp_path / 'a.jsonl'))
+
+    stats = JournalImporter(journal).import_path(write_jsonl(tmp_path / 'b.jsonl', [repeated]))
+
+    assert stats['imported'] == 1
+
+def test_unusable_lines_are_counted_and_skipped(journal, tmp_path):
+    archive = write_jsonl(tmp_path / 'journal.jsonl', RECORDS[:1], ['not json', '[1, 2]', '{"text": "no date"}'])
+
+    stats = JournalImporter(journal).import_path(archive)
+
+    assert (stats['read'], stats['imported'], stats['invalid']) == (4, 1, 3)
+
+def test_imported_entries_keep_their_fields(journal, tmp_path):
+    JournalImporter(journal).import_path(write_jsonl(tmp_path / 'journal.jsonl', RECORDS))
+
+    entries = {entry['text']: entry for entry in journal.get_all_entries()}
+    assert entries['First morning pages']['title'] == 'Day one'
+    assert entries['Second morning pages']['ai_response'] == {'archetype': 'The Sage'}
+    assert entries['Dated only']['date'] == '2024-03-03'
+    assert len(journal.get_daily_analytics()) == 3
@@ -0,0 +1,62 @@
+import random
+from datetime import datetime, timedelta
+from models import db, AnalyticsData, JournalEntry
+
+START = datetime(2024, 3, 1, 12)
+
+def streaks():
+    return {row.date: row.writing_streak for row in AnalyticsData.query.order_by(AnalyticsData.date)}
+
+def test_incremental_streaks_match_a_full_rebuild(journal):
+    offsets = list(range(30))
+    random.Random(7).shuffle(offsets)
+    for offset in offsets:
+        if offset % 9 != 4:  # leave gaps, filled in out of order below
+            journal.save_entry(f'Day {offset}', timestamp=START + timedelta(days=offset))
+    for offset in (13, 4, 22):
+        journal.save_entry(f'Late day {offset}', timestamp=START + timedelta(days=offset))
+    entry = JournalEntry.query.filter_by(text='Day 17').one()
+    journal.delete_entry(entry.id)
+
+    incremental = streaks()
+    journal.rebuild_analytics()
+    assert incremental == streaks()
+    assert max(incremental.values()) == 17  # days 0-16, cut by the deleted day 17
+
+def test_streak_update_stops_at_the_first_unchanged_day(journal):
+    for offset in range(10):
+        journal.save_entry(f'Day {offset}', timestamp=START + timedelta(days=offset))
+    # A wrong value past the first day whose streak is already right shows how far the update walked
+    last = AnalyticsData.query.filter_by(date=(START + timedelta(days=9)).date()).one()
+    last.writing_streak = 99
+    db.session.commit()
+
+    journal.save_entry('Second entry on day 2', timestamp=START + timedelta(days=2, hours=3))
+
+    assert streaks()[(START + timedelta(days=9)).date()] == 99
+
+def test_each_write_bumps_the_change_version_once(journal):
+    version = journal.get_change_version()[0]
+    entry = journal.save_entry('One write', timestamp=START)
+    assert journal.get_change_version()[0] == version + 1
+
+    journal.update_entry(entry['id'], {'text': 'One write, edited'})
+    assert journal.get_change_version()[0] == version + 2
+
+    journal.save_entries([{'text': f'Imported {i}', 'timestamp': START + timedelta(days=i)} for i in range(3)])
+    assert journal.get_change_version()[0] == version + 3
+
+    journal.delete_entry(entry['id'])
+    assert journal.get_change_version()[0] == version + 4
+
+def test_rollup_failure_keeps_the_entry(journal, monkeypatch):
+    def fail(entries):
+        raise RuntimeError('rollup failed')
+    monkeypatch.setattr(journal.pattern_analyzer, 'summarize_entries', fail)
+    version = journal.get_change_version()[0]
+
+    entry = journal.save_entry('Kept despite the rollup', timestamp=START)
+
+    assert journal.get_entry(entry['id'])['text'] == 'Kept despite the rollup'
+    assert journal.get_change_version()[0] == version + 1
+    assert AnalyticsData.query.count() == 0
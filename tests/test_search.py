@@ -0,0 +1,54 @@
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from models import db
+from migrations import create_sqlite_search_index
+
+def save_garden_entries(journal):
+    journal.save_entry('A long walk in the garden with my family', title='Sunday')
+    journal.save_entry('Deadlines at work again; the garden can wait')
+    journal.save_entry('Quiet evening reading')
+
+def test_fts_search_ranks_and_highlights(journal):
+    save_garden_entries(journal)
+
+    found = journal.search('garden')
+    assert len(found['results']) == 2
+    assert '<mark>garden</mark>' in str(found['results'][0]['snippet'])
+
+    assert [r['title'] for r in journal.search('famil')['results']] == ['Sunday']  # last term matches as a prefix
+    assert len(journal.search('garden work')['results']) == 1  # every term must match
+    assert journal.search('') == {'results': [], 'has_more': False}
+
+    paged = journal.search('garden', limit=1)
+    assert len(paged['results']) == 1 and paged['has_more']
+
+def test_search_index_follows_edits_and_deletes(journal):
+    entry = journal.save_entry('Planted tomatoes')
+    journal.update_entry(entry['id'], {'text': 'Planted peppers'})
+    assert journal.search('tomatoes')['results'] == []
+    assert len(journal.search('peppers')['results']) == 1
+
+    journal.delete_entry(entry['id'])
+    assert journal.search('peppers')['results'] == []
+
+def test_search_falls_back_to_like_without_the_index(journal):
+    save_garden_entries(journal)
+    with db.engine.begin() as connection:
+        for trigger in ('insert', 'delete', 'update'):
+            connection.execute(text(f"DROP TRIGGER journal_entries_fts_{trigger}"))
+        connection.execute(text("DROP TABLE journal_entries_fts"))
+    try:
+        found = journal.search('garden work')
+        assert [r['snippet'] for r in found['results']] == ['Deadlines at work again; the garden can wait']
+    finally:
+        assert create_sqlite_search_index()
+
+    assert len(journal.search('garden')['results']) == 2  # rebuilt from the entries
+
+def test_search_falls_back_to_like_when_fts_fails(journal, monkeypatch):
+    save_garden_entries(journal)
+    def broken(terms, limit, offset):
+        raise OperationalError('MATCH', {}, Exception('fts5: syntax error'))
+    monkeypatch.setattr(journal, '_search_fts', broken)
+
+    assert len(journal.search('garden')['results']) == 2
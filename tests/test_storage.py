@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import SingletonThreadPool
+from storage import is_memory_database, engine_options, configure_engine, sqlite_pragmas
+
+@pytest.mark.parametrize('url, expected', [
+    ('sqlite://', True),
+    ('sqlite:///:memory:', True),
+    ('sqlite:///file::memory:?cache=shared&uri=true', True),
+    ('sqlite:///file:scratch?mode=memory&uri=true', True),
+    ('sqlite:///selfscope.db', False),
+    ('sqlite:////var/lib/selfscope/selfscope.db', False),
+])
+def test_memory_database_detection(url, expected):
+    assert is_memory_database(url) is expected
+
+def test_pool_options_follow_the_database(tmp_path):
+    assert engine_options('sqlite://', 'wal')['poolclass'] is SingletonThreadPool
+    assert 'pool_size' not in engine_options('sqlite:///file:scratch?mode=memory&uri=true', 'wal')
+
+    file_options = engine_options(f'sqlite:///{tmp_path}/selfscope.db', 'wal')
+    assert file_options['pool_size'] == 5 and 'connect_args' in file_options
+    assert 'connect_args' not in engine_options(f'sqlite:///{tmp_path}/selfscope.db', 'default')
+
+    assert engine_options('postgresql://selfscope@localhost/selfscope')['pool_pre_ping']
+
+def test_wal_profile_pragmas_apply_to_each_connection(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/selfscope.db')
+    configure_engine(engine, 'wal')
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+    engine.dispose()
+
+def test_memory_database_keeps_every_pragma_but_wal():
+    engine = create_engine('sqlite://', **engine_options('sqlite://', 'wal'))
+    configure_engine(engine, 'wal')
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'memory'
+        assert connection.execute(text('PRAGMA temp_store')).scalar() == 2  # MEMORY
+    engine.dispose()
+
+def test_default_profile_leaves_sqlite_stock():
+    assert sqlite_pragmas('default') == []